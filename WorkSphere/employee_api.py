@@ -1,28 +1,74 @@
-from fastapi import HTTPException, Query
-from pydantic import BaseModel
-import sqlite3
+from fastapi import HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
+import csv
+import io
+import json
+import logging
+from itertools import islice
+from typing import Literal
 from fastapi import APIRouter
+from WorkSphere.http_cache import make_etag, is_not_modified, not_modified_response
+from WorkSphere.employee_store import EmployeeStore, FIELDS, EDITABLE_FIELDS, fts_query
+from WorkSphere.read_cache import ReadCache
+from WorkSphere.streaming import MEDIA_TYPES, stream_csv_or_ndjson
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
-# database connection setup
-def get_db():
-    conn = sqlite3.connect("employees.db")
-    conn.row_factory = sqlite3.Row  
-    return conn
-
-# create table if not exists
-with get_db() as conn:
-    conn.execute("""
-    CREATE TABLE IF NOT EXISTS employees (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        age INTEGER,
-        department TEXT,
-        salary INTEGER
-    )
-    """)
-    conn.commit()
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+BULK_CHUNK_SIZE = 1000             # rows validated and committed together
+MAX_REPORTED_ERRORS = 100          # row errors listed in a bulk response
+MAX_BATCH_UPDATES = 5000
+CACHE_SIZE = 1024                  # cached read results (lists, searches, employees)
+CACHE_TTL = 30                     # seconds; bounds staleness after CLI writes
+STREAM_BATCH_SIZE = 500            # rows fetched per step when streaming
+
+# database access (schema, pooled connections, SQL) lives in employee_store,
+# shared with the CLI
+store = EmployeeStore().init_schema()
+router.add_event_handler("startup", store.open)
+
+# log (without refusing to start) any query SQLite would run without its index;
+# tests/test_query_plans.py is the hard check
+def _warn_about_query_plans():
+    for problem in store.query_plan_problems():
+        logger.warning("employee query plan: %s", problem)
+
+router.add_event_handler("startup", _warn_about_query_plans)
+router.add_event_handler("shutdown", store.close)
+
+# read-through cache for listings, searches and single employees. Each entry
+# is tagged with what it depends on and the write endpoints invalidate exactly
+# those tags after committing.
+cache = ReadCache(maxsize=CACHE_SIZE, ttl=CACHE_TTL)
+LISTS = "lists"              # unfiltered listings
+DEPARTMENT_LISTS = "departments"  # every department-filtered listing
+SEARCHES = "searches"
+
+# listings are cached already serialized, so a hit skips the JSON encoding too
+def _encode(result) -> bytes:
+    return json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode()
+
+def _invalidate(departments=(), ids=(), department_changed=False):
+    tags = [LISTS, SEARCHES]
+    tags += [("department", d) for d in set(departments)]
+    tags += [("employee", i) for i in ids]
+    if department_changed:
+        tags.append(DEPARTMENT_LISTS)  # the old department is not known here
+    cache.invalidate(*tags)
+
+def _select_columns(fields: str | None) -> str:
+    if not fields:
+        return ", ".join(FIELDS)
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Invalid field(s): {', '.join(unknown)}")
+    # id is always returned, it is the page cursor
+    return ", ".join(f for f in FIELDS if f == "id" or f in requested)
 
 # pydantic model for employee
 class Employee(BaseModel):
@@ -31,6 +77,16 @@ class Employee(BaseModel):
     department: str
     salary: int
 
+# partial update: only the fields sent are changed
+class EmployeeUpdate(BaseModel):
+    name: str | None = None
+    age: int | None = None
+    department: str | None = None
+    salary: int | None = None
+
+class EmployeeBatchUpdate(EmployeeUpdate):
+    id: int
+
 @router.get("/welcome", tags=["Employee Manager"])
 def home():
     return {"message": "Welcome to Employee Manager API"}
@@ -38,71 +94,259 @@ def home():
 # endpoint to add employee
 @router.post("/add", tags=["Employee Manager"])
 def add_employee(emp: Employee):
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO employees (name, age, department, salary) VALUES (?, ?, ?, ?)",
-            (emp.name, emp.age, emp.department, emp.salary)
-        )
-        conn.commit()
-        return {"message": f"Employee '{emp.name}' added successfully!"}
+    store.add(emp.name, emp.age, emp.department, emp.salary)
+    _invalidate(departments=[emp.department])
+    return {"message": f"Employee '{emp.name}' added successfully!"}
+
+# validate and insert numbered rows chunk by chunk; each chunk is one
+# executemany in one transaction, so a failure never leaves half a chunk
+def _bulk_insert(rows):
+    inserted, rejected, errors = 0, 0, []
+    while True:
+        chunk = list(islice(rows, BULK_CHUNK_SIZE))
+        if not chunk:
+            break
+        valid = []
+        for row_number, row in chunk:
+            try:
+                emp = Employee.model_validate(row)
+            except ValidationError as e:
+                rejected += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    reasons = [f"{'.'.join(map(str, err['loc'])) or 'row'}: {err['msg']}" for err in e.errors()]
+                    errors.append({"row": row_number, "errors": reasons})
+                continue
+            valid.append((emp.name, emp.age, emp.department, emp.salary))
+        store.add_many(valid)
+        _invalidate(departments=[row[2] for row in valid])
+        inserted += len(valid)
+    return {
+        "message": f"Imported {inserted} employees, rejected {rejected}.",
+        "inserted": inserted,
+        "rejected": rejected,
+        "errors": errors,
+    }
+
+# decode and parse a whole CSV upload without keeping it, then rewind it
+def _check_csv(f):
+    text = io.TextIOWrapper(f, encoding="utf-8-sig", newline="")
+    try:
+        for _ in csv.reader(text):
+            pass
+    finally:
+        text.detach()  # leave the upload open for the import
+    f.seek(0)
+
+# endpoint to add many employees at once: either a JSON array of employees or
+# a CSV file upload (form field "file") with name,age,department,salary columns
+@router.post("/bulk", tags=["Employee Manager"])
+async def bulk_add_employees(request: Request):
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        async with request.form() as form:
+            upload = form.get("file")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=400, detail="Upload the CSV file in the 'file' field!")
+            # the upload is spooled to disk by the form parser; it is decoded
+            # once up front so a bad byte near the end is rejected before any
+            # chunk is committed, then read again a row at a time (row 1 is
+            # the header)
+            try:
+                await run_in_threadpool(_check_csv, upload.file)
+            except (UnicodeDecodeError, csv.Error) as e:
+                raise HTTPException(status_code=400, detail=f"Invalid CSV file, nothing was imported: {e}")
+            reader = csv.DictReader(io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline=""))
+            return await run_in_threadpool(_bulk_insert, enumerate(reader, start=2))
 
-# endpoint to view employees
+    try:
+        payload = await request.json()
+    except ValueError:
+        payload = None
+    if not isinstance(payload, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of employees or a CSV file upload!")
+    return await run_in_threadpool(_bulk_insert, enumerate(payload, start=1))
+
+# rows straight from a cursor as NDJSON or CSV, one chunk per fetched batch
+def _stream_rows(columns: str, department, after_id, limit, output_format: str):
+    batches = store.stream(columns, department, after_id, limit, batch_size=STREAM_BATCH_SIZE)
+    return stream_csv_or_ndjson(columns.split(", "), batches, output_format)
+
+# endpoint to view employees (answers If-None-Match with 304 while unchanged)
+# Without limit/after_id the whole (filtered) list is returned as before. With
+# them a page is returned; pass `next_after_id` back as `after_id` for the next
+# one. `fields=name,salary` returns only those columns (plus id).
+# `format=ndjson` or `format=csv` streams the rows instead (one JSON object per
+# line / a CSV with a header), in constant memory however large the table is.
 @router.get("/", tags=["Employee Manager"])
-def view_employees(department: str | None = Query(None)):
-    with get_db() as conn:
-        cursor = conn.cursor()
-        if department:
-            cursor.execute("SELECT * FROM employees WHERE department = ?", (department,))
-        else:
-            cursor.execute("SELECT * FROM employees")
-        rows = cursor.fetchall()
-        if not rows:
-            return {"message": "No employees found."}
-        return [dict(row) for row in rows]
+def view_employees(
+    request: Request,
+    department: str | None = Query(None),
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after_id: int | None = Query(None, ge=0),
+    fields: str | None = Query(None),
+    output_format: Literal["json", "ndjson", "csv"] = Query("json", alias="format"),
+):
+    columns = _select_columns(fields)
+    version = store.data_version()
+    etag = make_etag("employees", version)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+
+    if output_format != "json":
+        headers = {"ETag": etag}
+        if output_format == "csv":
+            headers["Content-Disposition"] = 'attachment; filename="employees.csv"'
+        return StreamingResponse(
+            _stream_rows(columns, department, after_id, limit, output_format),
+            media_type=MEDIA_TYPES[output_format],
+            headers=headers,
+        )
+
+    paged = limit is not None or after_id is not None
+    if paged:
+        limit = limit or DEFAULT_PAGE_SIZE
+
+    def load():
+        # one extra row tells whether there is a next page
+        rows = store.list(columns, department, after_id, limit + 1 if paged else None)
+        if not paged:
+            if not rows:
+                return {"message": "No employees found."}
+            return [dict(row) for row in rows]
+
+        page = [dict(row) for row in rows[:limit]]
+        next_after_id = page[-1]["id"] if len(rows) > limit else None
+        return {"employees": page, "count": len(page), "next_after_id": next_after_id}
+
+    tags = (("department", department), DEPARTMENT_LISTS) if department else (LISTS,)
+    # the data version is part of the key, so a body cached before any write
+    # (including one from the CLI, which never invalidates) is never served
+    # under a newer ETag
+    key = ("list", version, department, limit, after_id, columns)
+    body = cache.get_or_load(key, lambda: _encode(load()), tags)
+    return Response(body, media_type="application/json", headers={"ETag": etag})
+
+# endpoint for per-department statistics (headcount, salary avg/min/max, age
+# distribution); served from the trigger-maintained summary table
+@router.get("/stats", tags=["Employee Manager"])
+def employee_statistics(request: Request, response: Response, department: str | None = Query(None)):
+    etag = make_etag("employee-stats", store.data_version())
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    response.headers["ETag"] = etag
+    departments = store.stats(department)
+    if not departments:
+        return {"message": "No employees found."}
+    return {
+        "headcount": sum(d["headcount"] for d in departments),
+        "departments": departments,
+    }
+
+# endpoint to compare the summary table with a full recomputation
+@router.get("/stats/check", tags=["Employee Manager"])
+def check_statistics():
+    mismatched = store.check_stats()
+    return {"consistent": not mismatched, "mismatched_departments": mismatched}
+
+# endpoint to rebuild the summary table from scratch
+@router.post("/stats/rebuild", tags=["Employee Manager"])
+def rebuild_statistics():
+    mismatched = store.rebuild_stats()
+    return {"message": "Statistics rebuilt!", "mismatched_departments": mismatched}
 
 # endpoint to update employee
 @router.put("/update/{emp_id}", tags=["Employee Manager"])
 def update_employee(emp_id: int, field: str, new_value: str):
-    allowed_fields = ["name", "age", "department", "salary"]
-    if field not in allowed_fields:
+    if field not in EDITABLE_FIELDS:
         raise HTTPException(status_code=400, detail="Invalid field!")
 
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM employees WHERE id = ?", (emp_id,))
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Employee not found")
-
-        if field in ["age", "salary"]:
+    if field in ["age", "salary"]:
+        try:
             new_value = int(new_value)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"{field} must be a number!")
+
+    row = store.update(emp_id, {field: new_value})
+    if not row:
+        raise HTTPException(status_code=404, detail="Employee not found")
+    _invalidate(departments=[row["department"]], ids=[emp_id], department_changed=field == "department")
+    return {"message": f"Employee #{emp_id} updated successfully!"}
+
+def _changes(update: EmployeeUpdate, label: str) -> dict:
+    changes = update.model_dump(exclude_unset=True, exclude={"id"})
+    if not changes:
+        raise HTTPException(status_code=400, detail=f"{label}: nothing to update!")
+    if "name" in changes and changes["name"] is None:
+        raise HTTPException(status_code=400, detail=f"{label}: name cannot be empty!")
+    return changes
+
+# endpoint to update many employees in one transaction; every id must exist,
+# otherwise nothing is changed
+@router.patch("/batch", tags=["Employee Manager"])
+def batch_update_employees(updates: list[EmployeeBatchUpdate]):
+    if len(updates) > MAX_BATCH_UPDATES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_UPDATES} updates per batch!")
+    changes = [_changes(u, f"Update #{i} (id {u.id})") for i, u in enumerate(updates, start=1)]
+    try:
+        rows = store.update_many([(u.id, c) for u, c in zip(updates, changes)])
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Employees not found: {e.args[0]}. No changes were applied.")
+    _invalidate(
+        departments=[row["department"] for row in rows],
+        ids=[u.id for u in updates],
+        department_changed=any("department" in c for c in changes),
+    )
+    return {"message": f"Updated {len(rows)} employees!", "employees": [dict(row) for row in rows]}
 
-        cursor.execute(f"UPDATE employees SET {field} = ? WHERE id = ?", (new_value, emp_id))
-        conn.commit()
-        return {"message": f"Employee #{emp_id} updated successfully!"}
+# endpoint to update any of name/age/department/salary at once, in a single
+# UPDATE ... RETURNING statement
+@router.patch("/{emp_id}", tags=["Employee Manager"])
+def patch_employee(emp_id: int, update: EmployeeUpdate):
+    changes = _changes(update, f"Employee #{emp_id}")
+    row = store.update(emp_id, changes)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Employee not found")
+    _invalidate(departments=[row["department"]], ids=[emp_id], department_changed="department" in changes)
+    return {"message": f"Employee #{emp_id} updated successfully!", "employee": dict(row)}
 
 # endpoint to delete employee
 @router.delete("/delete/{emp_id}", tags=["Employee Manager"])
 def delete_employee(emp_id: int):
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM employees WHERE id = ?", (emp_id,))
-        if cursor.rowcount == 0:
-            raise HTTPException(status_code=404, detail="Employee not found")
-        conn.commit()
-        return {"message": f"Employee #{emp_id} deleted successfully!"}
-
-# endpoint to search employees
+    row = store.delete(emp_id)
+    if not row:
+        raise HTTPException(status_code=404, detail="Employee not found")
+    _invalidate(departments=[row["department"]], ids=[emp_id])
+    return {"message": f"Employee #{emp_id} deleted successfully!"}
+
+# endpoint to search employees, best name matches (bm25) first
 @router.get("/search", tags=["Employee Manager"])
-def search_employee(keyword: str):
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-        SELECT * FROM employees 
-        WHERE LOWER(name) LIKE LOWER(?) OR LOWER(department) LIKE LOWER(?) 
-        """, ('%' + keyword + '%', '%' + keyword + '%'))
-        rows = cursor.fetchall()
+def search_employee(keyword: str, limit: int = Query(100, ge=1, le=1000)):
+    match = fts_query(keyword)
+    if not match:
+        return {"message": f"No employees found for '{keyword}'."}
+
+    def load():
+        rows = store.search(keyword, limit)
         if not rows:
             return {"message": f"No employees found for '{keyword}'."}
         return [dict(row) for row in rows]
 
+    body = cache.get_or_load(("search", match, limit), lambda: _encode(load()), (SEARCHES,))
+    return Response(body, media_type="application/json")
+
+# endpoint reporting read cache counters (hits, misses, evictions, ...)
+@router.get("/cache/stats", tags=["Employee Manager"])
+def cache_statistics():
+    return cache.stats()
+
+# endpoint to get one employee by id (declared last so it does not shadow
+# /search, /stats, ...)
+@router.get("/{emp_id}", tags=["Employee Manager"])
+def get_employee(emp_id: int):
+    def load():
+        row = store.get(emp_id)
+        return dict(row) if row else None
+    employee = cache.get_or_load(("employee", emp_id), load, (("employee", emp_id),))
+    if employee is None:
+        raise HTTPException(status_code=404, detail="Employee not found")
+    return employee
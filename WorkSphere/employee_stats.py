@@ -0,0 +1,180 @@
+# per-department employee statistics, maintained incrementally
+#
+# employee_department_stats holds one row per department with the headcount,
+# salary sum/min/max and an age histogram. Triggers on `employees` add a row's
+# contribution on insert, take it away on delete and do both on update, so
+# reading the stats costs O(departments) however many employees there are.
+# Sums and counts are exact; min/max are recomputed for the one department
+# only when its current extreme is deleted or changed.
+#
+# check() recomputes everything with GROUP BY and lists departments that
+# drifted; rebuild() replaces the table with that recomputation.
+
+STATS_TABLE = "employee_department_stats"
+
+# (column, condition on an employee row `{r}`) for the age histogram
+AGE_BUCKETS = (
+    ("age_under_25", "{r}.age < 25"),
+    ("age_25_34", "{r}.age BETWEEN 25 AND 34"),
+    ("age_35_44", "{r}.age BETWEEN 35 AND 44"),
+    ("age_45_54", "{r}.age BETWEEN 45 AND 54"),
+    ("age_55_plus", "{r}.age >= 55"),
+)
+AGE_LABELS = {"age_under_25": "<25", "age_25_34": "25-34", "age_35_44": "35-44",
+              "age_45_54": "45-54", "age_55_plus": "55+"}
+
+COUNT_COLUMNS = ("headcount", "salaried", "salary_sum") + tuple(c for c, _ in AGE_BUCKETS)
+
+
+def _contribution(r):
+    # what one employee row adds to each counter column
+    values = {
+        "headcount": "1",
+        "salaried": f"({r}.salary IS NOT NULL)",
+        "salary_sum": f"IFNULL({r}.salary, 0)",
+    }
+    for column, condition in AGE_BUCKETS:
+        values[column] = f"IFNULL({condition.format(r=r)}, 0)"
+    return values
+
+
+def _add_row(r="new"):
+    values = _contribution(r)
+    return f"""
+        INSERT INTO {STATS_TABLE} (department, {", ".join(COUNT_COLUMNS)}, min_salary, max_salary)
+        VALUES (IFNULL({r}.department, ''), {", ".join(values[c] for c in COUNT_COLUMNS)}, {r}.salary, {r}.salary)
+        ON CONFLICT (department) DO UPDATE SET
+            {", ".join(f"{c} = {c} + excluded.{c}" for c in COUNT_COLUMNS)},
+            min_salary = CASE WHEN min_salary IS NULL OR excluded.min_salary < min_salary
+                              THEN excluded.min_salary ELSE min_salary END,
+            max_salary = CASE WHEN max_salary IS NULL OR excluded.max_salary > max_salary
+                              THEN excluded.max_salary ELSE max_salary END;"""
+
+
+def _extreme(function, department):
+    # MIN/MAX(salary) over the employees of the stats row of `department` (an
+    # SQL expression). Each subquery is a single equality on (department,
+    # salary), so it is one index seek; the '' row also holds NULL departments
+    # and needs one seek per value.
+    named = f"(SELECT {function}(salary) FROM employees WHERE department = {department})"
+    unnamed = (f"(SELECT {function}(extreme) FROM ("
+               f"SELECT {function}(salary) AS extreme FROM employees WHERE department = '' UNION ALL "
+               f"SELECT {function}(salary) FROM employees WHERE department IS NULL))")
+    return named, unnamed
+
+
+def _remove_row(r="old"):
+    values = _contribution(r)
+    department = f"IFNULL({r}.department, '')"
+    named_min, unnamed_min = _extreme("MIN", f"{r}.department")
+    named_max, unnamed_max = _extreme("MAX", f"{r}.department")
+    return f"""
+        UPDATE {STATS_TABLE} SET
+            {", ".join(f"{c} = {c} - {values[c]}" for c in COUNT_COLUMNS)}
+        WHERE department = {department};
+        UPDATE {STATS_TABLE} SET min_salary = {named_min}, max_salary = {named_max}
+        WHERE department = {r}.department AND {r}.department <> ''
+          AND {r}.salary IN (min_salary, max_salary);
+        UPDATE {STATS_TABLE} SET min_salary = {unnamed_min}, max_salary = {unnamed_max}
+        WHERE department = '' AND {department} = ''
+          AND {r}.salary IN (min_salary, max_salary);
+        DELETE FROM {STATS_TABLE} WHERE department = {department} AND headcount = 0;"""
+
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS {STATS_TABLE} (
+    department TEXT PRIMARY KEY,
+    {"".join(f"{c} INTEGER NOT NULL DEFAULT 0, " for c in COUNT_COLUMNS)}
+    min_salary INTEGER,
+    max_salary INTEGER
+);
+CREATE TRIGGER IF NOT EXISTS employees_stats_insert AFTER INSERT ON employees BEGIN
+    {_add_row("new")}
+END;
+CREATE TRIGGER IF NOT EXISTS employees_stats_delete AFTER DELETE ON employees BEGIN
+    {_remove_row("old")}
+END;
+CREATE TRIGGER IF NOT EXISTS employees_stats_update AFTER UPDATE OF age, department, salary ON employees BEGIN
+    {_remove_row("old")}
+    {_add_row("new")}
+END;
+"""
+
+TRIGGERS = ("employees_stats_insert", "employees_stats_delete", "employees_stats_update")
+
+
+def trigger_queries():
+    """(description, statement, parameters) for the lookups the triggers run,
+    since EXPLAIN does not show the plans of trigger programs."""
+    queries = []
+    for function in ("MIN", "MAX"):
+        named, unnamed = _extreme(function, "?")
+        queries.append((f"stats trigger {function.lower()}", f"SELECT {named}", ("Sales",)))
+        queries.append((f"stats trigger {function.lower()}, no department", f"SELECT {unnamed}", ()))
+    return queries
+
+_RECOMPUTE = f"""
+SELECT IFNULL(department, '') AS department,
+       COUNT(*), COUNT(salary), IFNULL(SUM(salary), 0),
+       {", ".join(f"SUM(IFNULL({cond.format(r='employees')}, 0))" for _, cond in AGE_BUCKETS)},
+       MIN(salary), MAX(salary)
+FROM employees GROUP BY IFNULL(department, '')
+"""
+
+_COLUMNS = ("department",) + COUNT_COLUMNS + ("min_salary", "max_salary")
+
+
+def install(conn):
+    """Create the stats table and triggers; fill the table if it is new."""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = ?", (STATS_TABLE,)
+    ).fetchone() is not None
+    conn.executescript(SCHEMA)
+    if not exists:
+        rebuild(conn)
+
+
+def reinstall_triggers(conn):
+    """Replace the triggers of an existing install with the current definitions."""
+    for trigger in TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    conn.executescript(SCHEMA)
+
+
+def rebuild(conn):
+    conn.execute(f"DELETE FROM {STATS_TABLE}")
+    conn.execute(f"INSERT INTO {STATS_TABLE} ({', '.join(_COLUMNS)}) {_RECOMPUTE}")
+
+
+def check(conn):
+    """Return the departments whose stored stats differ from a full recomputation."""
+    expected = {row[0]: tuple(row) for row in conn.execute(_RECOMPUTE)}
+    stored = {row[0]: tuple(row) for row in conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM {STATS_TABLE}")}
+    return sorted(d for d in expected.keys() | stored.keys() if expected.get(d) != stored.get(d))
+
+
+def read_query(department=None):
+    query = f"SELECT {', '.join(_COLUMNS)} FROM {STATS_TABLE}"
+    params = ()
+    if department is not None:
+        query += " WHERE department = ?"
+        params = (department,)
+    return query + " ORDER BY department", params
+
+
+def read(conn, department=None):
+    return [_to_dict(dict(zip(_COLUMNS, row))) for row in conn.execute(*read_query(department))]
+
+
+def _to_dict(row):
+    ages = {AGE_LABELS[c]: row[c] for c, _ in AGE_BUCKETS}
+    ages["unknown"] = row["headcount"] - sum(ages.values())
+    return {
+        "department": row["department"],
+        "headcount": row["headcount"],
+        "total_salary": row["salary_sum"],
+        "avg_salary": round(row["salary_sum"] / row["salaried"], 2) if row["salaried"] else None,
+        "min_salary": row["min_salary"],
+        "max_salary": row["max_salary"],
+        "age_distribution": ages,
+    }
@@ -0,0 +1,419 @@
+# data access for employees.db, shared by the API (employee_api.py) and the
+# CLI (employee_management_system.py)
+#
+# EmployeeStore owns the schema (table, indexes, full-text index, statistics
+# and version triggers), the tuned connections and every SQL statement, so
+# indexes, pragmas and batching apply to both entry points. Each method runs
+# in its own transaction on the calling thread's connection and returns
+# sqlite3.Row objects (or None when the employee does not exist).
+#
+# The schema is versioned with PRAGMA user_version: MIGRATIONS lists numbered
+# steps and migrate() applies the ones a database has not seen yet. Steps are
+# idempotent (IF NOT EXISTS), so databases created before versioning, or a
+# step interrupted half way, simply run them again.
+#
+# QUERY_PLANS lists the statements the API and CLI run; query_plan_problems()
+# asks SQLite how it would execute each one and reports any full table scan or
+# missing index. tests/test_query_plans.py asserts there are none on a fresh
+# migrated database; the API only logs them at startup, since the planner's
+# choices on a real database also depend on its data and ANALYZE statistics.
+import re
+import sqlite3
+import threading
+
+from WorkSphere import employee_stats
+
+DB_FILE = "employees.db"
+CACHE_SIZE_KB = 16 * 1024          # page cache per connection
+MMAP_SIZE = 256 * 1024 * 1024      # bytes of the file read through mmap
+
+FIELDS = ("id", "name", "age", "department", "salary")
+EDITABLE_FIELDS = ("name", "age", "department", "salary")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS employees (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    age INTEGER,
+    department TEXT,
+    salary INTEGER
+);
+-- department filter (and its pages, ordered by id) without a table scan
+CREATE INDEX IF NOT EXISTS idx_employees_department ON employees (department, id);
+
+-- data version for ETags; triggers bump it on every write, from any process
+CREATE TABLE IF NOT EXISTS employees_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO employees_version (id, version) VALUES (1, 0);
+CREATE TRIGGER IF NOT EXISTS employees_version_insert AFTER INSERT ON employees
+BEGIN UPDATE employees_version SET version = version + 1 WHERE id = 1; END;
+CREATE TRIGGER IF NOT EXISTS employees_version_update AFTER UPDATE ON employees
+BEGIN UPDATE employees_version SET version = version + 1 WHERE id = 1; END;
+CREATE TRIGGER IF NOT EXISTS employees_version_delete AFTER DELETE ON employees
+BEGIN UPDATE employees_version SET version = version + 1 WHERE id = 1; END;
+"""
+
+# covering indexes: per-department salary min/max (the statistics triggers)
+# read only the index, and name lookups/sorting skip the table scan
+COVERING_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_employees_department_salary ON employees (department, salary);
+CREATE INDEX IF NOT EXISTS idx_employees_name ON employees (name);
+"""
+
+# full-text index over name and department, kept in sync by triggers
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS employees_fts USING fts5(
+    name, department, content='employees', content_rowid='id', prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS employees_fts_insert AFTER INSERT ON employees BEGIN
+    INSERT INTO employees_fts (rowid, name, department) VALUES (new.id, new.name, new.department);
+END;
+CREATE TRIGGER IF NOT EXISTS employees_fts_delete AFTER DELETE ON employees BEGIN
+    INSERT INTO employees_fts (employees_fts, rowid, name, department)
+    VALUES ('delete', old.id, old.name, old.department);
+END;
+CREATE TRIGGER IF NOT EXISTS employees_fts_update AFTER UPDATE OF name, department ON employees BEGIN
+    INSERT INTO employees_fts (employees_fts, rowid, name, department)
+    VALUES ('delete', old.id, old.name, old.department);
+    INSERT INTO employees_fts (rowid, name, department) VALUES (new.id, new.name, new.department);
+END;
+"""
+
+def _install_fts(conn):
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'employees_fts'").fetchone() is not None
+    conn.executescript(FTS_SCHEMA)
+    if not exists:  # index the rows written before it existed
+        conn.execute("INSERT INTO employees_fts (employees_fts) VALUES ('rebuild')")
+
+# (user_version after the step, SQL script or callable(conn))
+MIGRATIONS = [
+    (1, SCHEMA),
+    (2, _install_fts),
+    (3, employee_stats.install),
+    (4, COVERING_INDEXES),
+    (5, employee_stats.reinstall_triggers),  # min/max recompute without OR
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def migrate(conn):
+    """Bring the database up to SCHEMA_VERSION; returns the versions applied."""
+    current = conn.execute("PRAGMA user_version").fetchone()[0]
+    applied = []
+    for version, step in MIGRATIONS:
+        if version <= current:
+            continue
+        if callable(step):
+            step(conn)
+        else:
+            conn.executescript(step)
+        conn.execute(f"PRAGMA user_version = {version}")
+        conn.commit()
+        applied.append(version)
+    return applied
+
+
+INSERT = "INSERT INTO employees (name, age, department, salary) VALUES (?, ?, ?, ?)"
+GET = "SELECT * FROM employees WHERE id = ?"
+DELETE = "DELETE FROM employees WHERE id = ? RETURNING *"
+DATA_VERSION = "SELECT version FROM employees_version WHERE id = 1"
+
+
+def update_query(fields):
+    assignments = ", ".join(f"{field} = ?" for field in fields)
+    return f"UPDATE employees SET {assignments} WHERE id = ? RETURNING *"
+
+# departments that currently have employees, one row each
+DEPARTMENTS = f"SELECT department FROM {employee_stats.STATS_TABLE}"
+
+
+def search_query(name_match=None, departments=None, limit=100):
+    """(statement, parameters) for a search: FTS5 `name_match` against names,
+    ranked, and/or only the employees of `departments`.
+
+    Departments are matched through idx_employees_department instead of the
+    full-text index: FTS5 ranks every match before applying LIMIT, and a
+    department word matches a whole department (about half a second for 170k
+    of a million rows). Without a name match, each department contributes its
+    first `limit` ids and the merge keeps the lowest.
+    """
+    if name_match is None:
+        arms = " UNION ALL ".join(
+            f"SELECT * FROM (SELECT * FROM employees WHERE department = ? ORDER BY id LIMIT ?) AS department_{i}"
+            for i in range(len(departments))
+        )
+        params = [p for department in departments for p in (department, limit)]
+        return f"{arms} ORDER BY id LIMIT ?", params + [limit]
+    if departments is None:
+        # FTS5 keeps only the best `limit`, so only those are joined back
+        return """
+SELECT employees.* FROM (
+    SELECT rowid, rank FROM employees_fts WHERE employees_fts MATCH ? ORDER BY rank LIMIT ?
+) AS hits
+JOIN employees ON employees.id = hits.rowid
+ORDER BY hits.rank
+""", [name_match, limit]
+    return f"""
+SELECT employees.* FROM employees_fts
+JOIN employees ON employees.id = employees_fts.rowid
+WHERE employees_fts MATCH ? AND employees.department IN ({", ".join("?" * len(departments))})
+ORDER BY employees_fts.rank LIMIT ?
+""", [name_match, *departments, limit]
+
+
+# Every thread keeps one tuned connection and reuses it, instead of paying
+# connect + schema parse + a cold page cache for each request. The server's
+# worker threads come and go (anyio retires idle ones), so each new checkout
+# first closes the connections whose thread has exited; otherwise every
+# retired thread would leave an open connection and its file descriptors.
+class ConnectionPool:
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._conns = []  # (thread, connection)
+        self._generation = 0  # bumped by close_all() so threads reconnect
+
+    def connect(self):
+        # check_same_thread is off only so close_all() and the dead thread
+        # sweep may close it from another thread; otherwise a connection
+        # stays with its own thread
+        conn = sqlite3.connect(self.db_file, timeout=30, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous=NORMAL")  # safe with WAL, no fsync per commit
+        conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def get(self):
+        if getattr(self._local, "generation", None) != self._generation:
+            conn = self.connect()
+            with self._lock:
+                dead = [c for t, c in self._conns if not t.is_alive()]
+                self._conns = [(t, c) for t, c in self._conns if t.is_alive()]
+                self._conns.append((threading.current_thread(), conn))
+            for old in dead:
+                old.close()
+            self._local.conn, self._local.generation = conn, self._generation
+        return self._local.conn
+
+    def open_connections(self):
+        with self._lock:
+            return len(self._conns)
+
+    def close_all(self):
+        with self._lock:
+            conns, self._conns = self._conns, []
+            self._generation += 1
+        for _, conn in conns:
+            conn.close()
+
+
+# turn free text into an FTS5 query: every word must match the start of a
+# word in the name or department ("ali eng" finds "Alice" in "Engineering")
+def fts_query(keyword):
+    return " ".join(f'"{w}"*' for w in re.findall(r"\w+", keyword))
+
+
+def _words(text):
+    return re.findall(r"\w+", text.casefold())
+
+
+def list_query(columns=", ".join(FIELDS), department=None, after_id=None, limit=None):
+    query, params = f"SELECT {columns} FROM employees WHERE id > ?", [after_id or 0]
+    if department:
+        query += " AND department = ?"
+        params.append(department)
+    query += " ORDER BY id"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    return query, params
+
+
+# (description, statement, parameters, tables it may scan, index it must use)
+# for every query the API and CLI run, built from the same constants and
+# builders as the EmployeeStore methods.
+QUERY_PLANS = [
+    ("list", *list_query(), (), None),
+    ("list page", *list_query(after_id=100, limit=51), (), None),
+    # without its index this one is a rowid range walk, not a SCAN, so the
+    # index is named explicitly
+    ("list by department", *list_query(department="Sales", after_id=100, limit=51), (),
+     "INDEX idx_employees_department ("),
+    ("list projected page", *list_query("id, name", after_id=100, limit=51), (), None),
+    ("get", GET, (1,), (), None),
+    ("update", update_query(("name", "salary")), ("x", 1, 1), (), None),
+    ("delete", DELETE, (1,), (), None),
+    # hits holds at most `limit` rows
+    ("search", *search_query('name : "x"*', limit=10), ("hits",), None),
+    ("search in departments", *search_query('name : "x"*', ["Sales", "Support"], 10), (), None),
+    # each department_N holds at most `limit` rows
+    ("search departments", *search_query(departments=["Sales", "Support"], limit=10),
+     ("department_0", "department_1"), "INDEX idx_employees_department ("),
+    ("departments", DEPARTMENTS, (), (employee_stats.STATS_TABLE,), None),
+    ("data version", DATA_VERSION, (), (), None),
+    ("stats", *employee_stats.read_query(), (employee_stats.STATS_TABLE,), None),
+    ("stats by department", *employee_stats.read_query("Sales"), (), None),
+] + [
+    (name, query, params, (), "COVERING INDEX idx_employees_department_salary (department=?)")
+    for name, query, params in employee_stats.trigger_queries()
+]
+
+
+# "SCAN employees ..." (SQLite 3.36+) or "SCAN TABLE employees ..." (older);
+# "SCAN CONSTANT ROW" is a SELECT without FROM, not a table
+_SCAN = re.compile(r"SCAN (?!CONSTANT ROW)(?:TABLE |SUBQUERY \d+ AS )?(\S+)")
+
+
+def query_plan_problems(conn):
+    """List every query in QUERY_PLANS that scans a table or does not use the
+    index it needs (empty when all is well)."""
+    problems = []
+    for name, query, params, allowed, required in QUERY_PLANS:
+        plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params)]
+        for detail in plan:
+            scan = _SCAN.match(detail)
+            if scan and "VIRTUAL TABLE" not in detail and scan.group(1) not in allowed:
+                problems.append(f"{name}: {detail}")
+        if required and not any(required in detail for detail in plan):
+            problems.append(f"{name}: does not use {required} ({'; '.join(plan)})")
+    return problems
+
+
+class EmployeeStore:
+    def __init__(self, db_file=DB_FILE):
+        self.pool = ConnectionPool(db_file)
+
+    @property
+    def conn(self):
+        return self.pool.get()
+
+    # ---------- lifecycle ----------
+    def init_schema(self):
+        migrate(self.conn)
+        return self
+
+    def query_plan_problems(self):
+        # a fresh connection: cached statements may hold plans from before a
+        # schema change
+        conn = self.pool.connect()
+        try:
+            return query_plan_problems(conn)
+        finally:
+            conn.close()
+
+    def open(self):
+        # WAL is stored in the database file, so it only has to be set once;
+        # readers then no longer block behind the writer (or the CLI)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        return self
+
+    def close(self):
+        self.pool.close_all()
+
+    def data_version(self):
+        return self.conn.execute(DATA_VERSION).fetchone()[0]
+
+    # ---------- writes ----------
+    def add(self, name, age, department, salary):
+        with self.conn as conn:
+            return conn.execute(INSERT, (name, age, department, salary)).lastrowid
+
+    def add_many(self, rows):
+        """Insert (name, age, department, salary) tuples in one transaction."""
+        with self.conn as conn:
+            conn.executemany(INSERT, rows)
+
+    def _update(self, conn, emp_id, changes):
+        return conn.execute(update_query(changes), (*changes.values(), emp_id)).fetchone()
+
+    def update(self, emp_id, changes):
+        """Apply {field: value} in one UPDATE ... RETURNING; the new row or None."""
+        with self.conn as conn:
+            return self._update(conn, emp_id, changes)
+
+    def update_many(self, updates):
+        """Apply [(id, changes)] in one transaction.
+
+        Returns the new rows, or raises KeyError with the missing ids after
+        rolling everything back.
+        """
+        conn = self.conn
+        with conn:
+            rows = [self._update(conn, emp_id, changes) for emp_id, changes in updates]
+            missing = [emp_id for (emp_id, _), row in zip(updates, rows) if row is None]
+            if missing:
+                raise KeyError(missing)
+        return rows
+
+    def delete(self, emp_id):
+        """Delete an employee; the deleted row or None."""
+        with self.conn as conn:
+            return conn.execute(DELETE, (emp_id,)).fetchone()
+
+    # ---------- reads ----------
+    def get(self, emp_id):
+        return self.conn.execute(GET, (emp_id,)).fetchone()
+
+    def list(self, columns=", ".join(FIELDS), department=None, after_id=None, limit=None):
+        return self.conn.execute(*list_query(columns, department, after_id, limit)).fetchall()
+
+    def stream(self, columns=", ".join(FIELDS), department=None, after_id=None, limit=None, batch_size=500):
+        """Yield lists of row tuples, batch_size at a time.
+
+        Uses a connection of its own, since a streaming response may resume
+        the generator on a different thread for every batch.
+        """
+        conn = self.pool.connect()
+        try:
+            cursor = conn.execute(*list_query(columns, department, after_id, limit))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [tuple(row) for row in rows]
+        finally:
+            conn.close()
+
+    def search(self, keyword, limit=100):
+        """Employees matching every word of `keyword` as a prefix.
+
+        A word that starts a word of a department name ("eng", "sales")
+        selects that department; the other words must start a word of the
+        name. Name matches come best (bm25) first, department-only searches
+        in id order.
+        """
+        words = _words(keyword)
+        if not words:
+            return []
+        conn = self.conn
+        known = [row[0] for row in conn.execute(DEPARTMENTS) if row[0]]
+        departments, names = None, []
+        for word in words:
+            matched = {d for d in known if any(w.startswith(word) for w in _words(d))}
+            if not matched:
+                names.append(word)
+            else:
+                departments = matched if departments is None else departments & matched
+        if departments is not None and not departments:
+            return []  # e.g. "sales eng": no department matches both
+        name_match = " ".join(f'name : "{w}"*' for w in names) or None
+        departments = sorted(departments) if departments is not None else None
+        return conn.execute(*search_query(name_match, departments, limit)).fetchall()
+
+    # ---------- statistics ----------
+    def stats(self, department=None):
+        return employee_stats.read(self.conn, department)
+
+    def check_stats(self):
+        return employee_stats.check(self.conn)
+
+    def rebuild_stats(self):
+        with self.conn as conn:
+            mismatched = employee_stats.check(conn)
+            employee_stats.rebuild(conn)
+        return mismatched
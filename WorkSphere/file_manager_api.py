@@ -1,13 +1,18 @@
 # API to upload and extract data from Databases (PostgreSQL and MongoDB)
-from fastapi import FastAPI, UploadFile, File, APIRouter
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, UploadFile, File, APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from pymongo import MongoClient
 import aiofiles
 import os
 import uuid
 from datetime import datetime
+from typing import Literal
+from WorkSphere.pg_copy import PostgresCopySink, quote_identifier
+from WorkSphere.ingest_pipeline import Pipeline
+from WorkSphere.ingest_jobs import JobManager, JobQueueFull
+from WorkSphere.streaming import MEDIA_TYPES, stream_csv_or_ndjson
 
 router = APIRouter()
 app = FastAPI(title="Uploading and Extracting Data")
@@ -20,78 +25,151 @@ mongo_client = MongoClient("mongodb://localhost:27017/")
 mongo_db = mongo_client["database"]
 mongo_collection = mongo_db["collection"]
 
+# PostgreSQL table that uploads are appended to
+UPLOAD_TABLE = "mytable"
+
 # Folder to store exports temporarily
 EXPORT_FOLDER = "exports"
 os.makedirs(EXPORT_FOLDER, exist_ok=True)
 
+# Saving a chunk into MongoDB in batches
+MONGO_BATCH_SIZE = 1000
+
+def write_mongo(chunk):
+    docs = chunk.to_dict(orient="records")
+    for i in range(0, len(docs), MONGO_BATCH_SIZE):
+        mongo_collection.insert_many(docs[i:i + MONGO_BATCH_SIZE])
+
+# Uploads are parsed and written as background jobs, never on the event loop,
+# so a large file does not stall the other routers served by the same process
+ingest_jobs = JobManager()
+router.add_event_handler("shutdown", ingest_jobs.shutdown)
+
+# Estimating the rows of a CSV file by counting its lines (quoted newlines make it approximate)
+def count_csv_rows(path):
+    lines = 0
+    last = b"\n"
+    with open(path, "rb") as f:
+        while block := f.read(1024 * 1024):
+            lines += block.count(b"\n")
+            last = block[-1:]
+    if last != b"\n":
+        lines += 1  # no newline after the last row
+    return max(lines - 1, 0)  # minus the header
+
 @router.get("/", tags=["File Manager"])
 def get_files():
     return {"message": "Welcome to File Manager API"}
 
-# endpoint to upload file in Database
-@router.post("/upload", tags=["File Manager"])
-async def upload_file(file: UploadFile = File(...)):
+# Reading an uploaded file and writing it to both databases (runs as an ingest job)
+def ingest_file(job, temp_path, filename):
     try:
-        temp_path = f"temp_{uuid.uuid4().hex}_{os.path.basename(file.filename)}"
-
-        # Saving file temporarily
-        async with aiofiles.open(temp_path, "wb") as f:
-            while chunk := await file.read(1024 * 1024):  # 1 MB chunks
-                await f.write(chunk)
+        if job.cancel_event.is_set():
+            return None
 
         # Reading file with pandas
-        if file.filename.endswith(".csv"):
+        if filename.endswith(".csv"):
+            job.rows_total = count_csv_rows(temp_path)
             chunks = pd.read_csv(temp_path, chunksize=10000)
         else:
             chunks = [pd.read_excel(temp_path)]
 
-        total_rows = 0
-        columns = None
-
-        for chunk in chunks:
-            total_rows += len(chunk)
-            if columns is None:
-                columns = list(chunk.columns)
-
-            # Saving into PostgreSQL
-            chunk.to_sql("mytable", pg_engine, if_exists="append", index=False)
-
-            # Saving into MongoDB in batches
-            docs = chunk.to_dict(orient="records")
-            batch_size = 1000
-            for i in range(0, len(docs), batch_size):
-                mongo_collection.insert_many(docs[i:i + batch_size])
+        # PostgreSQL (streamed with COPY) and MongoDB are written concurrently,
+        # each from its own bounded queue of chunks
+        pg_sink = PostgresCopySink(pg_engine, UPLOAD_TABLE)
+        job.pipeline = Pipeline({"postgres": pg_sink.write, "mongo": write_mongo}, cancel=job.cancel_event)
+        try:
+            job.result = job.pipeline.run(chunks)
+        finally:
+            pg_sink.close()
+
+        if job.result["cancelled"]:
+            return f"Upload of {filename} cancelled after {job.result['rows']} rows"
+        return f"Data from {filename} uploaded successfully!"
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+# endpoint to upload file in Database (queues an ingest job and returns its id)
+@router.post("/upload", tags=["File Manager"])
+async def upload_file(file: UploadFile = File(...)):
+    if ingest_jobs.full():
+        raise HTTPException(status_code=429, detail="Too many uploads in progress, try again later!")
 
+    temp_path = f"temp_{uuid.uuid4().hex}_{os.path.basename(file.filename)}"
+    try:
+        # Saving file temporarily
+        async with aiofiles.open(temp_path, "wb") as f:
+            while chunk := await file.read(1024 * 1024):  # 1 MB chunks
+                await f.write(chunk)
+        job = ingest_jobs.submit(file.filename, ingest_file, temp_path, file.filename)
+    except JobQueueFull as e:
         os.remove(temp_path)
-
-        return {
-            "message": f"Data from {file.filename} uploaded successfully!",
-            "rows": total_rows,
-            "columns": columns
-        }
-
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
         return {"error": str(e)}
 
-# endpoint to export file from sql DB
-@router.get("/export/sql", tags=["File Manager"])
-def export_sql():
+    return {
+        "message": f"{file.filename} received, ingestion queued",
+        "job_id": job.id,
+        "status": job.status
+    }
+
+# endpoint to list upload jobs (most recent first)
+@router.get("/jobs", tags=["File Manager"])
+def list_jobs():
+    return [job.to_dict() for job in reversed(ingest_jobs.list())]
+
+# endpoint to check an upload job's progress
+@router.get("/jobs/{job_id}", tags=["File Manager"])
+def get_job(job_id: str):
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found!")
+    return job.to_dict()
+
+# endpoint to cancel an upload job (rows already written are kept)
+@router.post("/jobs/{job_id}/cancel", tags=["File Manager"])
+def cancel_job(job_id: str):
+    job = ingest_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found!")
+    return job.to_dict()
+
+# Rows fetched per round trip from the server-side cursor while exporting
+EXPORT_BATCH_SIZE = 5000
+
+# rows from a server-side cursor as CSV or NDJSON, one chunk per fetched batch
+def stream_export(conn, result, output_format):
     try:
-        df = pd.read_sql("SELECT * FROM mytable", pg_engine)
-        filename = f"export_sql_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        filepath = os.path.join(EXPORT_FOLDER, filename)
-        df.to_excel(filepath, index=False)
+        yield from stream_csv_or_ndjson(list(result.keys()), result.partitions(EXPORT_BATCH_SIZE), output_format)
+    finally:
+        result.close()
+        conn.close()
 
-        return FileResponse(
-            path=filepath,
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            filename=filename,
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
+# endpoint to export file from sql DB (streamed as CSV or NDJSON, no temp file)
+@router.get("/export/sql", tags=["File Manager"])
+def export_sql(output_format: Literal["csv", "ndjson"] = Query("csv", alias="format")):
+    conn = pg_engine.connect()
+    try:
+        # stream_results makes psycopg2 use a named (server-side) cursor, so
+        # only about EXPORT_BATCH_SIZE rows are held in memory at a time
+        result = conn.execution_options(stream_results=True, max_row_buffer=EXPORT_BATCH_SIZE).execute(
+            text(f"SELECT * FROM {quote_identifier(UPLOAD_TABLE)}")
         )
-
     except Exception as e:
+        conn.close()
         return {"error": str(e)}
 
+    filename = f"export_sql_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{output_format}"
+    return StreamingResponse(
+        stream_export(conn, result, output_format),
+        media_type=MEDIA_TYPES[output_format],
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
 # endpoint to export file from mongoDB
 @router.get("/export/mongo", tags=["File Manager"])
 def export_mongo():
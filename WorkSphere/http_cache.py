@@ -0,0 +1,22 @@
+# conditional GET helpers shared by the list endpoints
+#
+# Routers keep a monotonically increasing data version and turn it into an
+# ETag. Clients that send the ETag back in If-None-Match get an empty
+# 304 Not Modified instead of the full payload while nothing has changed.
+from fastapi import Request, Response
+
+
+def make_etag(name: str, version: int) -> str:
+    return f'"{name}-{version}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
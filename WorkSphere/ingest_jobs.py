@@ -0,0 +1,164 @@
+# background upload jobs with progress, cancellation and a concurrency limit
+#
+# JobManager runs at most `max_running` jobs at a time on its own thread pool
+# and accepts at most `max_queued` more waiting behind them; submit() raises
+# JobQueueFull beyond that so the API can answer 429 instead of piling up temp
+# files. Each job owns the Pipeline writing it, so its status can report rows
+# parsed and rows written per sink while it runs, plus throughput and an ETA
+# when the total row count is known (or estimated) up front.
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_RUNNING_JOBS = 2
+MAX_QUEUED_JOBS = 8
+KEEP_FINISHED_JOBS = 100
+
+ACTIVE = ("queued", "running", "cancelling")
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class IngestJob:
+    def __init__(self, filename):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.status = "queued"
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.rows_total = None  # estimate, set by the work function if it can
+        self.pipeline = None    # set by the work function once writing starts
+        self.cancel_event = threading.Event()
+        self.result = None
+        self.message = None
+        self.error = None
+
+    @property
+    def active(self):
+        return self.status in ACTIVE
+
+    def to_dict(self):
+        pipeline = self.pipeline
+        sinks = pipeline.sink_rows() if pipeline is not None else {}
+        parsed = pipeline.rows if pipeline is not None else 0
+        written = min(sinks.values()) if sinks else 0  # rows in every sink
+
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+        throughput = written / elapsed if elapsed and written else None
+
+        progress = eta = None
+        if self.status == "done":
+            progress = 1.0
+        elif self.rows_total:
+            progress = min(written / self.rows_total, 1.0)
+            if self.status == "running" and throughput:
+                eta = max(self.rows_total - written, 0) / throughput
+
+        job = {
+            "job_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "rows_parsed": parsed,
+            "rows_total_estimate": self.rows_total,
+            "rows_written": sinks,
+            "rows_per_second": round(throughput, 1) if throughput else None,
+            "elapsed_seconds": round(elapsed, 1) if elapsed is not None else None,
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+            "progress": round(progress, 4) if progress is not None else None,
+        }
+        if self.message:
+            job["message"] = self.message
+        if self.error:
+            job["error"] = self.error
+        if self.result is not None:
+            job["rows"] = self.result["rows"]
+            job["columns"] = self.result["columns"]
+            job["sinks"] = self.result["sinks"]
+        return job
+
+
+class JobManager:
+    def __init__(self, max_running=MAX_RUNNING_JOBS, max_queued=MAX_QUEUED_JOBS,
+                 keep_finished=KEEP_FINISHED_JOBS):
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.keep_finished = keep_finished
+        self._pool = ThreadPoolExecutor(max_workers=max_running, thread_name_prefix="ingest")
+        self._jobs = OrderedDict()  # job id -> IngestJob, oldest first
+        self._lock = threading.Lock()
+
+    def _active_count(self):
+        return sum(1 for job in self._jobs.values() if job.active)
+
+    def full(self):
+        with self._lock:
+            return self._active_count() >= self.max_running + self.max_queued
+
+    def submit(self, filename, work, *args):
+        """Queue work(job, *args) for a new job and return the job.
+
+        work() should set job.pipeline (and job.rows_total if known), watch
+        job.cancel_event and store the pipeline result in job.result; it may
+        return a message for the finished job.
+        """
+        with self._lock:
+            if self._active_count() >= self.max_running + self.max_queued:
+                raise JobQueueFull(f"{self.max_running + self.max_queued} upload jobs are already pending")
+            job = IngestJob(filename)
+            self._jobs[job.id] = job
+            self._prune()
+        self._pool.submit(self._run, job, work, args)
+        return job
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if not job.active]
+        for job_id in finished[:max(len(finished) - self.keep_finished, 0)]:
+            del self._jobs[job_id]
+
+    def _run(self, job, work, args):
+        # work() still runs for a job cancelled while queued, so it can clean up
+        with self._lock:
+            job.started_at = time.time()
+            if job.status == "queued":
+                job.status = "running"
+        status = "failed"
+        try:
+            job.message = work(job, *args)
+            status = "done"
+        except Exception as e:
+            job.error = str(e)
+        finally:
+            with self._lock:
+                job.finished_at = time.time()
+                job.status = "cancelled" if job.cancel_event.is_set() else status
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id):
+        """Ask a job to stop; returns the job, or None if it does not exist."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.active:
+                job.cancel_event.set()
+                job.status = "cancelling"
+        return job
+
+    def shutdown(self):
+        with self._lock:
+            for job in self._jobs.values():
+                if job.active:
+                    job.cancel_event.set()
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,98 @@
+# upload pipeline: one reader feeding several database sinks concurrently
+#
+# The caller's thread reads chunks and puts each one on a bounded queue per
+# sink; every sink drains its queue on its own thread. The sinks therefore
+# overlap (total time approaches the slowest sink instead of their sum) and a
+# sink that falls QUEUE_SIZE chunks behind blocks the reader, so memory stays
+# bounded by roughly QUEUE_SIZE + 2 chunks however large the file is.
+#
+# Chunks are shared between sinks, so sink functions must not modify them.
+import queue
+import threading
+import time
+
+QUEUE_SIZE = 4  # chunks buffered per sink
+
+_DONE = object()
+
+
+class SinkWorker(threading.Thread):
+    def __init__(self, sink_name, write, queue_size=QUEUE_SIZE, cancel=None):
+        super().__init__(name=f"ingest-{sink_name}", daemon=True)
+        self.sink_name = sink_name
+        self.write = write
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.cancel = cancel
+        self.rows = 0
+        self.seconds = 0.0  # time spent inside write()
+        self.error = None
+
+    def run(self):
+        while True:
+            chunk = self.queue.get()
+            if chunk is _DONE:
+                return
+            if self.error is not None or (self.cancel is not None and self.cancel.is_set()):
+                continue  # keep draining so the reader is never stuck on put()
+            start = time.perf_counter()
+            try:
+                self.write(chunk)
+            except BaseException as e:
+                self.error = e
+            else:
+                self.rows += len(chunk)
+            self.seconds += time.perf_counter() - start
+
+
+class Pipeline:
+    """Write every chunk to every sink ({name: write(chunk)}) concurrently.
+
+    `rows` and each worker's `rows` can be read from other threads while run()
+    is going. Setting the `cancel` event stops reading and makes the workers
+    skip whatever is still queued; chunks already written stay written.
+    """
+
+    def __init__(self, sinks, queue_size=QUEUE_SIZE, cancel=None):
+        self.cancel = cancel if cancel is not None else threading.Event()
+        self.workers = [SinkWorker(name, write, queue_size, self.cancel) for name, write in sinks.items()]
+        self.rows = 0
+        self.columns = None
+
+    def sink_rows(self):
+        return {worker.sink_name: worker.rows for worker in self.workers}
+
+    def run(self, chunks):
+        """Feed `chunks` to the sinks; re-raise the first sink error once all workers stop."""
+        for worker in self.workers:
+            worker.start()
+
+        start = time.perf_counter()
+        try:
+            for chunk in chunks:
+                if self.cancel.is_set() or any(worker.error is not None for worker in self.workers):
+                    break
+                if self.columns is None:
+                    self.columns = list(chunk.columns)
+                for worker in self.workers:
+                    worker.queue.put(chunk)  # blocks while this sink is queue_size chunks behind
+                self.rows += len(chunk)
+        finally:
+            for worker in self.workers:
+                worker.queue.put(_DONE)
+            for worker in self.workers:
+                worker.join()
+
+        for worker in self.workers:
+            if worker.error is not None:
+                raise worker.error
+        return {
+            "rows": self.rows,
+            "columns": self.columns,
+            "cancelled": self.cancel.is_set(),
+            "seconds": round(time.perf_counter() - start, 3),
+            "sinks": {
+                worker.sink_name: {"rows": worker.rows, "seconds": round(worker.seconds, 3)}
+                for worker in self.workers
+            },
+        }
+
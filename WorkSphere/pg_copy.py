@@ -0,0 +1,82 @@
+# bulk loading DataFrame chunks into PostgreSQL with COPY FROM STDIN
+#
+# DataFrame.to_sql sends INSERT statements, which costs a round trip and
+# statement execution per row (or per small batch). COPY streams rows in one
+# command and lets the server parse them in bulk, usually an order of magnitude
+# faster. Each chunk is rendered as CSV into one reusable in-memory buffer and
+# handed to psycopg2's copy_expert, so at most one chunk is ever held as text.
+#
+# read_csv infers dtypes per chunk: an integer column that happens to have a
+# gap in a later chunk arrives as float64 and would be written as "12.0",
+# which COPY rejects for a BIGINT column (INSERT used to cast it silently).
+# Columns that are integers in the table are therefore written through
+# pandas' nullable Int64, so gaps become NULL and values stay "12".
+import io
+
+from sqlalchemy import Integer, inspect
+
+
+def quote_identifier(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+class PostgresCopySink:
+    def __init__(self, engine, table):
+        self.engine = engine
+        self.table = table
+        self._conn = None
+        self._copy_sql = None
+        self._integer_columns = ()
+        self._buffer = io.StringIO()
+
+    def _open(self, chunk):
+        # create the table with the same column types to_sql would pick (an
+        # empty to_sql is a no-op when it already exists)
+        chunk.head(0).to_sql(self.table, self.engine, if_exists="append", index=False)
+        columns = ", ".join(quote_identifier(c) for c in chunk.columns)
+        self._copy_sql = f"COPY {quote_identifier(self.table)} ({columns}) FROM STDIN WITH (FORMAT csv)"
+        # the table may predate this upload, so ask it rather than the chunk
+        self._integer_columns = [
+            column["name"] for column in inspect(self.engine).get_columns(self.table)
+            if isinstance(column["type"], Integer) and column["name"] in chunk.columns
+        ]
+        self._conn = self.engine.raw_connection()
+
+    def _conform(self, chunk):
+        floats = [c for c in self._integer_columns if chunk[c].dtype.kind == "f"]
+        if not floats:
+            return chunk
+        chunk = chunk.copy(deep=False)  # the chunk is shared with the other sinks
+        for column in floats:
+            try:
+                chunk[column] = chunk[column].astype("Int64")
+            except TypeError:
+                raise ValueError(f"Column '{column}' has non-integer values but "
+                                 f"'{self.table}' stores it as an integer") from None
+        return chunk
+
+    def write(self, chunk):
+        """COPY one DataFrame chunk into the table and commit it."""
+        if self._conn is None:
+            self._open(chunk)
+        buffer = self._buffer
+        buffer.seek(0)
+        buffer.truncate()
+        # NaN/None/<NA> become unquoted empty fields, which COPY reads as NULL
+        self._conform(chunk).to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        cursor = self._conn.cursor()
+        try:
+            cursor.copy_expert(self._copy_sql, buffer)
+            self._conn.commit()
+        except Exception:
+            self._conn.rollback()
+            raise
+        finally:
+            cursor.close()
+        return len(chunk)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,100 @@
+# in-process read-through cache with LRU eviction, a TTL and tag invalidation
+#
+# Every entry is stored with a set of tags describing what it was built from
+# (e.g. ("employee", 7) or ("department", "Sales")). Write paths call
+# invalidate() with the tags they touched, so only the entries that can have
+# changed are dropped. The TTL bounds staleness for writes this process never
+# sees (the CLI, or other uvicorn workers).
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class ReadCache:
+    def __init__(self, maxsize=1024, ttl=30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires at, value, tags)
+        self._tagged = {}              # tag -> keys carrying it
+        self._lock = threading.Lock()
+        self._generation = 0           # bumped by every invalidation
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                self._drop(key)
+                self.expirations += 1
+            self.misses += 1
+            return _MISSING
+
+    def put(self, key, value, tags=(), generation=None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return  # a write landed while the value was being loaded
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, tuple(tags))
+            for tag in tags:
+                self._tagged.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_or_load(self, key, load, tags=()):
+        """Return the cached value for `key`, or call load() and cache its result.
+
+        A None result (nothing found) is returned but not cached.
+        """
+        generation = self._generation
+        value = self.get(key)
+        if value is _MISSING:
+            value = load()
+            if value is not None:
+                self.put(key, value, tags, generation)
+        return value
+
+    def invalidate(self, *tags):
+        with self._lock:
+            self._generation += 1
+            for tag in tags:
+                for key in list(self._tagged.get(tag, ())):
+                    self._drop(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tagged.clear()
+
+    def _drop(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[tag]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,30 @@
+# row streaming for StreamingResponse, shared by the employee listing and the
+# SQL export: rows arrive in batches (from a cursor) and leave as CSV or
+# NDJSON text, one chunk per batch, so memory stays bounded by a batch
+import csv
+import io
+import json
+
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def stream_csv_or_ndjson(names, batches, fmt):
+    """Yield `batches` (lists of row tuples with columns `names`) as CSV text
+    with a header or as one JSON object per line."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(names)
+        yield buffer.getvalue()  # header first, even for an empty result
+        buffer.seek(0)
+        buffer.truncate()
+    for rows in batches:
+        if fmt == "csv":
+            writer.writerows(rows)
+        else:
+            for row in rows:
+                buffer.write(json.dumps(dict(zip(names, row)), ensure_ascii=False, default=str))
+                buffer.write("\n")
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
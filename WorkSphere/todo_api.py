@@ -1,30 +1,67 @@
 # to-do list manager
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import json
+from typing import Literal
+import time
+from WorkSphere.todo_store import BatchError, JournalWriteError, LazyStore, open_store
+from WorkSphere.http_cache import make_etag, is_not_modified, not_modified_response
+from WorkSphere.todo_events import ChangeFeed
 
 router = APIRouter()
 
-# Pydantic Models 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+MAX_BULK_OPERATIONS = 5000
+SYNC_TIMEOUT = 10  # seconds a bulk request waits for its journal write
+
+# Pydantic Models
 class Task(BaseModel):
     task: str
     priority: str = "Medium"
     completed: bool = False
 
-def save_tasks(filename="tasks.json"):
-    with open(filename, "w") as f:
-        json.dump(tasks, f, indent=4)
+class BulkOperation(BaseModel):
+    op: Literal["add", "edit", "complete", "delete", "priority"]
+    id: int | None = None          # target task, required for everything but add
+    task: str | None = None        # add / edit
+    priority: str | None = None    # add / edit / priority
+    completed: bool = False        # add
 
-def load_tasks(filename="tasks.json"):
-    global tasks
-    try:
-        with open(filename, "r") as f:
-            tasks = json.load(f)
-    except FileNotFoundError:
-        tasks = []
+class BulkRequest(BaseModel):
+    operations: list[BulkOperation]
+
+# task storage: tasks.json snapshot + journal by default, or SQLite when
+# WORKSPHERE_TODO_BACKEND=sqlite. Opened lazily so importing this module (and
+# starting the server) does not wait for the task list to load.
+def _open_store():
+    opened = open_store()
+    opened.listeners.append(feed.publish)
+    return opened
+
+feed = ChangeFeed()
+store = LazyStore(_open_store)
+router.add_event_handler("startup", store.open_in_background)
+# flush the journal writer's last group on shutdown
+router.add_event_handler("shutdown", store.close)
 
-tasks = []
-load_tasks()
+# helper functions
+def _normalize_priority(priority: str) -> str:
+    priority = priority.capitalize()
+    if priority not in ["High", "Medium", "Low"]:
+        priority = "Medium"
+    return priority
+
+def _found_or_404(task: dict | None, detail: str = "Task not found!") -> dict:
+    if task is None:
+        raise HTTPException(status_code=404, detail=detail)
+    return task
+
+def _id_at_or_404(task_number: int) -> int:
+    task_id = store.id_at(task_number)
+    if task_id is None:
+        raise HTTPException(status_code=404, detail="Invalid task number!")
+    return task_id
 
 @router.get("/welcome", tags=["To-Do List Manager"])
 def welcome():
@@ -33,56 +70,179 @@ def welcome():
 # endpoint to add task
 @router.post("/add", tags=["To-Do List Manager"])
 def add_task(task: Task):
-    tasks.append(task.model_dump())
-    save_tasks()
-    return {"message": "Task added successfully!", "task": task.model_dump()}
+    task.priority = _normalize_priority(task.priority)  # the by-priority filter matches this form
+    record = store.add(task.model_dump())
+    return {"message": "Task added successfully!", "task": record}
 
 # endpoint to view task
+# Without query parameters the whole list is returned as before. With any of
+# limit/cursor/priority/completed a page is served from the secondary indexes;
+# pass `next_cursor` back as `cursor` to fetch the following page.
+# Responses carry an ETag; send it back in If-None-Match to get a 304 while
+# the list has not changed.
 @router.get("/", tags=["To-Do List Manager"])
-def view_tasks():
-    if not tasks:
-        return {"message": "No tasks in the list."}
-    return tasks
+def view_tasks(
+    request: Request,
+    response: Response,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: int | None = Query(None, ge=0),
+    priority: str | None = Query(None),
+    completed: bool | None = Query(None),
+):
+    etag = make_etag("todo", store.version)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    response.headers["ETag"] = etag
+
+    if limit is None and cursor is None and priority is None and completed is None:
+        if not len(store):
+            return {"message": "No tasks in the list."}
+        return store.all()
+
+    if priority is not None:
+        priority = priority.capitalize()
+    page, next_cursor = store.page(
+        limit or DEFAULT_PAGE_SIZE, cursor=cursor, priority=priority, completed=completed
+    )
+    return {"tasks": page, "count": len(page), "next_cursor": next_cursor}
+
+# endpoint streaming task changes as server-sent events: a "hello" event with
+# the current version, then "added"/"updated"/"deleted" events carrying the
+# task and the new version. After "reset" the client should reload the list.
+@router.get("/events", tags=["To-Do List Manager"])
+async def task_events(request: Request):
+    return StreamingResponse(
+        feed.stream(request, lambda: store.version),  # may open the store
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# endpoint to search tasks; every word of `q` must match a word (or the start
+# of one) in the task, best matches first
+@router.get("/search", tags=["To-Do List Manager"])
+def search_tasks(q: str = Query(..., min_length=1), limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE)):
+    results = [dict(task, score=round(score, 4)) for task, score in store.search(q, limit)]
+    if not results:
+        return {"message": f"No tasks found for '{q}'.", "results": []}
+    return {"query": q, "count": len(results), "results": results}
+
+# endpoint to apply many operations at once; all of them or none are applied
+# and the batch is persisted with a single durable journal write
+@router.post("/bulk", tags=["To-Do List Manager"])
+def bulk_tasks(request: BulkRequest):
+    start = time.perf_counter()
+    if len(request.operations) > MAX_BULK_OPERATIONS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_OPERATIONS} operations per batch!")
+
+    records = []
+    for i, op in enumerate(request.operations, start=1):
+        if op.op != "add" and op.id is None:
+            raise HTTPException(status_code=400, detail=f"Operation #{i} ({op.op}): 'id' is required!")
+        if op.op in ("add", "edit") and not op.task:
+            raise HTTPException(status_code=400, detail=f"Operation #{i} ({op.op}): 'task' is required!")
+        if op.op == "priority" and not op.priority:
+            raise HTTPException(status_code=400, detail=f"Operation #{i} (priority): 'priority' is required!")
+
+        if op.op == "add":
+            task = Task(task=op.task, priority=_normalize_priority(op.priority or "Medium"), completed=op.completed)
+            records.append({"op": "add", "task": task.model_dump()})
+        elif op.op == "delete":
+            records.append({"op": "delete", "id": op.id})
+        else:
+            fields = {}
+            if op.op == "edit":
+                fields["task"] = op.task
+                if op.priority:
+                    fields["priority"] = op.priority.capitalize()
+            elif op.op == "complete":
+                fields["completed"] = True
+            else:
+                fields["priority"] = _normalize_priority(op.priority)
+            records.append({"op": "update", "id": op.id, "fields": fields})
+
+    try:
+        applied = store.apply_batch(records)
+    except BatchError as e:
+        raise HTTPException(
+            status_code=404 if "not found" in e.reason else 400,
+            detail=f"Operation #{e.index + 1} ({request.operations[e.index].op}) failed: {e.reason}. No changes were applied.",
+        )
+    # the whole batch is on disk before we answer
+    try:
+        durable = store.sync(timeout=SYNC_TIMEOUT)
+    except JournalWriteError as e:
+        raise HTTPException(status_code=503, detail=f"{e}. The batch is applied and will be saved once writing recovers.")
+    if not durable:
+        raise HTTPException(status_code=503, detail="The batch is applied but was not saved in time, try again later.")
+
+    results = [
+        {"op": op.op, "id": task["id"], "status": "ok", "task": task}
+        for op, task in zip(request.operations, applied)
+    ]
+    return {
+        "message": f"Applied {len(results)} operations!",
+        "results": results,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+    }
+
+# ---------- endpoints addressing tasks by their stable id ----------
+# The store returns None when the task does not exist (any more), so the check
+# and the change happen under one lock instead of racing each other.
+
+# endpoint to get a task by id
+@router.get("/tasks/{task_id}", tags=["To-Do List Manager"])
+def get_task(task_id: int):
+    return _found_or_404(store.get(task_id))
+
+# endpoint to delete a task by id
+@router.delete("/tasks/{task_id}", tags=["To-Do List Manager"])
+def delete_task_by_id(task_id: int):
+    removed = _found_or_404(store.delete(task_id))
+    return {"message": f"Removed: {removed['task']}", "id": task_id}
+
+# endpoint to edit a task by id
+@router.put("/tasks/{task_id}/edit", tags=["To-Do List Manager"])
+def edit_task_by_id(task_id: int, new_task: str, new_priority: str = "Medium"):
+    task = _found_or_404(store.update(task_id, task=new_task, priority=new_priority.capitalize()))
+    return {"message": f"Updated Task #{task_id} → {new_task}", "task": task}
+
+# endpoint to mark a task as completed by id
+@router.put("/tasks/{task_id}/complete", tags=["To-Do List Manager"])
+def mark_complete_by_id(task_id: int):
+    task = _found_or_404(store.update(task_id, completed=True))
+    return {"message": f"'{task['task']}' marked as completed!", "task": task}
+
+# endpoint to set priority of a task by id
+@router.put("/tasks/{task_id}/priority", tags=["To-Do List Manager"])
+def set_priority_by_id(task_id: int, new_priority: str):
+    new_priority = _normalize_priority(new_priority)
+    task = _found_or_404(store.update(task_id, priority=new_priority))
+    return {"message": f"Priority set to {new_priority} for '{task['task']}'", "task": task}
+
+# ---------- positional endpoints (kept for older clients) ----------
 
 # endpoint to delete task
 @router.delete("/delete/{task_number}", tags=["To-Do List Manager"])
 def delete_task(task_number: int):
-    if 0 < task_number <= len(tasks):
-        removed = tasks.pop(task_number - 1)
-        save_tasks()
-        return {"message": f"Removed: {removed['task']}"}
-    raise HTTPException(status_code=404, detail="Invalid task number!")
+    removed = _found_or_404(store.delete(_id_at_or_404(task_number)), "Invalid task number!")
+    return {"message": f"Removed: {removed['task']}"}
 
 # endpoint to edit task
 @router.put("/edit/{task_number}", tags=["To-Do List Manager"])
 def edit_task(task_number: int, new_task: str, new_priority: str = "Medium"):
-    if 0 < task_number <= len(tasks):
-        tasks[task_number - 1]["task"] = new_task
-        tasks[task_number - 1]["priority"] = new_priority.capitalize()
-        save_tasks()
-        return {"message": f"Updated Task #{task_number} → {new_task}"}
-    raise HTTPException(status_code=404, detail="Invalid task number!")
+    task_id = _id_at_or_404(task_number)
+    _found_or_404(store.update(task_id, task=new_task, priority=new_priority.capitalize()), "Invalid task number!")
+    return {"message": f"Updated Task #{task_number} → {new_task}"}
 
 # endpoint to mark as completed a task
 @router.put("/complete/{task_number}", tags=["To-Do List Manager"])
 def mark_complete(task_number: int):
-    if 0 < task_number <= len(tasks):
-        tasks[task_number - 1]["completed"] = True
-        save_tasks()
-        return {"message": f"'{tasks[task_number - 1]['task']}' marked as completed!"}
-    raise HTTPException(status_code=404, detail="Invalid task number!")
+    task = _found_or_404(store.update(_id_at_or_404(task_number), completed=True), "Invalid task number!")
+    return {"message": f"'{task['task']}' marked as completed!"}
 
 # endpoint to set priority of a task
 @router.put("/priority/{task_number}", tags=["To-Do List Manager"])
 def set_priority(task_number: int, new_priority: str):
-    if 0 < task_number <= len(tasks):
-        new_priority = new_priority.capitalize()
-        if new_priority not in ["High", "Medium", "Low"]:
-            new_priority = "Medium"
-        tasks[task_number - 1]["priority"] = new_priority
-        save_tasks()
-        return {"message": f"Priority set to {new_priority} for '{tasks[task_number - 1]['task']}'"}
-    raise HTTPException(status_code=404, detail="Invalid task number!")
-
-
-
+    new_priority = _normalize_priority(new_priority)
+    task = _found_or_404(store.update(_id_at_or_404(task_number), priority=new_priority), "Invalid task number!")
+    return {"message": f"Priority set to {new_priority} for '{task['task']}'"}
@@ -0,0 +1,90 @@
+# change feed for the to-do list (served as server-sent events)
+#
+# Stores call publish() from request threads after every change. Each open
+# GET /todo/events stream owns a bounded asyncio queue on the event loop; a
+# client too slow to drain it gets a "reset" event and should reload the list.
+import asyncio
+import json
+import threading
+
+QUEUE_SIZE = 1000        # events buffered per client before it is reset
+HEARTBEAT_SECONDS = 15   # comment line sent on idle streams to keep proxies happy
+
+
+class _Subscriber:
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.overflowed = False
+
+    def push(self, event):
+        # runs on the event loop thread
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class ChangeFeed:
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        subscriber = _Subscriber(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, kind, task, version):
+        """Queue an "added"/"updated"/"deleted" event for every open stream."""
+        event = {"type": kind, "task": task, "version": version}
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.push, event)
+            except RuntimeError:  # the loop is gone, the stream is closing
+                self.unsubscribe(subscriber)
+
+    async def stream(self, request, current_version):
+        """Async generator of SSE frames for one client.
+
+        `current_version` is called (on a worker thread) only after subscribing,
+        so a change committed meanwhile is either covered by the "hello"
+        version or delivered as an event; queued events that the hello
+        version already covers are skipped.
+        """
+        subscriber = self.subscribe()
+        try:
+            version = await asyncio.to_thread(current_version)
+            yield format_event("hello", {"type": "hello", "version": version})
+            while not await request.is_disconnected():
+                if subscriber.overflowed:
+                    subscriber.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+                    subscriber.overflowed = False
+                    yield format_event("reset", {"type": "reset"})
+                    continue
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if event["version"] <= version:
+                    continue
+                yield format_event(event["type"], event, event_id=event["version"])
+        finally:
+            self.unsubscribe(subscriber)
+
+
+def format_event(kind, data, event_id=None):
+    frame = f"event: {kind}\ndata: {json.dumps(data)}\n\n"
+    if event_id is not None:
+        frame = f"id: {event_id}\n" + frame
+    return frame
@@ -0,0 +1,112 @@
+# in-memory full-text index for to-do tasks
+#
+# An inverted index maps every token to the tasks containing it (with term
+# counts). The vocabulary is also kept as a sorted list, so a prefix query is a
+# bisect plus a short walk instead of a scan over every token. Stores keep the
+# index current by calling add()/remove() on each mutation, and create it in
+# one pass with build().
+import heapq
+import math
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+class TaskSearchIndex:
+    def __init__(self):
+        self.postings = {}   # token -> {task id: term count}
+        self.vocabulary = [] # sorted tokens, for prefix lookups
+        self.docs = {}       # task id -> its distinct tokens
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, items):
+        """Index an iterable of (task id, text) pairs in one pass."""
+        index = cls()
+        postings = index.postings
+        for task_id, text in items:
+            counts = {}
+            for token in TOKEN_RE.findall(text.lower()):
+                counts[token] = counts.get(token, 0) + 1
+            index.docs[task_id] = tuple(counts)
+            for token, count in counts.items():
+                posting = postings.get(token)
+                if posting is None:
+                    posting = postings[token] = {}
+                posting[task_id] = count
+        index.vocabulary = sorted(index.postings)
+        return index
+
+    # ---------- maintenance ----------
+    def add(self, task_id, text):
+        counts = Counter(tokenize(text))
+        with self._lock:
+            self._remove(task_id)
+            self.docs[task_id] = tuple(counts)
+            for token, count in counts.items():
+                posting = self.postings.get(token)
+                if posting is None:
+                    posting = self.postings[token] = {}
+                    insort(self.vocabulary, token)
+                posting[task_id] = count
+
+    def remove(self, task_id):
+        with self._lock:
+            self._remove(task_id)
+
+    def _remove(self, task_id):
+        for token in self.docs.pop(task_id, ()):
+            posting = self.postings[token]
+            del posting[task_id]
+            if not posting:
+                del self.postings[token]
+                del self.vocabulary[bisect_left(self.vocabulary, token)]
+
+    def __len__(self):
+        return len(self.docs)
+
+    # ---------- queries ----------
+    def _expand(self, term):
+        # tokens starting with `term`
+        vocabulary = self.vocabulary
+        i = bisect_left(vocabulary, term)
+        # walk by index: slicing (or islice) would cost O(vocabulary) per term
+        while i < len(vocabulary) and vocabulary[i].startswith(term):
+            yield vocabulary[i]
+            i += 1
+
+    def search(self, query, limit=20):
+        """Return [(task id, score)] for tasks matching every query term.
+
+        Each term matches whole tokens or token prefixes; exact matches count
+        double. Scores are tf-idf sums, so rare words weigh more.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+        with self._lock:
+            total = len(self.docs) or 1
+            scores = None
+            for term in terms:
+                term_scores = {}
+                for token in self._expand(term):
+                    posting = self.postings[token]
+                    weight = math.log(1 + total / len(posting)) * (2.0 if token == term else 1.0)
+                    for task_id, count in posting.items():
+                        score = weight * (1 + math.log(count))
+                        if score > term_scores.get(task_id, 0):
+                            term_scores[task_id] = score
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {i: s + term_scores[i] for i, s in scores.items() if i in term_scores}
+                if not scores:
+                    return []
+        return heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
@@ -0,0 +1,285 @@
+# SQLite storage backend for the to-do list
+#
+# Selected with WORKSPHERE_TODO_BACKEND=sqlite. The database runs in WAL mode so
+# several uvicorn workers can read while one writes, and priority/completion
+# filters are served by (column, id) indexes. It exposes the same methods as
+# todo_store.TaskStore, so todo_api.py does not care which one it talks to.
+#
+# Search uses the same in-memory inverted index as the JSON store. Writes made
+# by this process update it incrementally; when tasks_version shows that some
+# other process wrote to the table, the next search rebuilds it first.
+#
+# An existing tasks.json (plus its journal tail) is imported the first time the
+# database is opened empty. The import can also be run by hand:
+#     python -m WorkSphere.todo_sqlite [tasks.json] [tasks.db]
+import os
+import sqlite3
+import sys
+import threading
+
+from WorkSphere.todo_store import BatchError, TaskStore, SNAPSHOT_FILE, JOURNAL_FILE, CHANGE_KINDS
+from WorkSphere.todo_search import TaskSearchIndex
+
+DB_FILE = os.environ.get("WORKSPHERE_TODO_DB", "tasks.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    task TEXT NOT NULL,
+    priority TEXT NOT NULL DEFAULT 'Medium',
+    completed INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_priority ON tasks (priority, id);
+CREATE INDEX IF NOT EXISTS idx_tasks_completed ON tasks (completed, id);
+-- both filters at once, still in id order
+CREATE INDEX IF NOT EXISTS idx_tasks_priority_completed ON tasks (priority, completed, id);
+
+-- data version for ETags, bumped by every write from any worker
+CREATE TABLE IF NOT EXISTS tasks_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO tasks_version (id, version) VALUES (1, 0);
+CREATE TRIGGER IF NOT EXISTS tasks_version_insert AFTER INSERT ON tasks
+BEGIN UPDATE tasks_version SET version = version + 1 WHERE id = 1; END;
+CREATE TRIGGER IF NOT EXISTS tasks_version_update AFTER UPDATE ON tasks
+BEGIN UPDATE tasks_version SET version = version + 1 WHERE id = 1; END;
+CREATE TRIGGER IF NOT EXISTS tasks_version_delete AFTER DELETE ON tasks
+BEGIN UPDATE tasks_version SET version = version + 1 WHERE id = 1; END;
+"""
+
+COLUMNS = ("task", "priority", "completed")
+
+
+def _row_to_task(row):
+    return {"task": row[1], "priority": row[2], "completed": bool(row[3]), "id": row[0]}
+
+
+class SqliteTaskStore:
+    def __init__(self, db_file=DB_FILE, snapshot_file=SNAPSHOT_FILE, journal_file=JOURNAL_FILE):
+        self.db_file = db_file
+        self.snapshot_file = snapshot_file
+        self.journal_file = journal_file
+        self._local = threading.local()  # one connection per worker thread
+        self.search_index = None
+        self._search_version = None      # tasks_version the index reflects
+        self._search_lock = threading.Lock()
+        self.listeners = []  # callables(kind, task dict, version); see TaskStore
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ---------- loading ----------
+    def load(self):
+        self.conn.executescript(SCHEMA)
+        empty = self.conn.execute("SELECT 1 FROM tasks LIMIT 1").fetchone() is None
+        if empty and os.path.exists(self.snapshot_file):
+            migrate_json(self.snapshot_file, self.journal_file, conn=self.conn)
+        return self  # the search index is built by the first search
+
+    # ---------- mutations ----------
+    def _apply(self, cur, record):
+        op = record["op"]
+        if op == "add":
+            task = record["task"]
+            cur.execute(
+                "INSERT INTO tasks (task, priority, completed) VALUES (?, ?, ?) RETURNING *",
+                (task["task"], task.get("priority", "Medium"), int(task.get("completed", False))),
+            )
+            return _row_to_task(cur.fetchone())
+        elif op == "delete":
+            cur.execute("DELETE FROM tasks WHERE id = ? RETURNING *", (record["id"],))
+        elif op == "update":
+            fields = {k: v for k, v in record["fields"].items() if k in COLUMNS}
+            if "completed" in fields:
+                fields["completed"] = int(fields["completed"])
+            assignments = ", ".join(f"{k} = ?" for k in fields) or "id = id"
+            cur.execute(
+                f"UPDATE tasks SET {assignments} WHERE id = ? RETURNING *",
+                (*fields.values(), record["id"]),
+            )
+        else:
+            raise ValueError(f"Unknown operation: {op}")
+        row = cur.fetchone()
+        if row is None:
+            raise KeyError(record["id"])
+        return _row_to_task(row)
+
+    def _read_version(self, cur):
+        return cur.execute("SELECT version FROM tasks_version WHERE id = 1").fetchone()[0]
+
+    def _commit(self, record):
+        cur = self.conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        before = self._read_version(cur)
+        try:
+            result = self._apply(cur, record)
+        except KeyError:
+            cur.execute("ROLLBACK")
+            return None  # the task is gone, e.g. deleted by a concurrent request
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+        after = self._read_version(cur)
+        cur.execute("COMMIT")
+        self._index_changes([record], [result], before, after)
+        self._notify([record], [result], after)
+        return result
+
+    def add(self, task):
+        return self._commit({"op": "add", "task": task})
+
+    def delete(self, task_id):
+        return self._commit({"op": "delete", "id": task_id})
+
+    def update(self, task_id, **fields):
+        return self._commit({"op": "update", "id": task_id, "fields": fields})
+
+    def apply_batch(self, records):
+        cur = self.conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        before = self._read_version(cur)
+        results = []
+        for index, record in enumerate(records):
+            try:
+                results.append(self._apply(cur, record))
+            except (KeyError, ValueError) as e:
+                cur.execute("ROLLBACK")
+                reason = f"task {record.get('id')} not found" if isinstance(e, KeyError) else str(e)
+                raise BatchError(index, reason) from None
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+        after = self._read_version(cur)
+        cur.execute("COMMIT")
+        self._index_changes(records, results, before, after)
+        self._notify(records, results, after)
+        return results
+
+    def _notify(self, records, results, version):
+        # only changes made through this process reach its listeners
+        for record, task in zip(records, results):
+            for listener in self.listeners:
+                listener(CHANGE_KINDS[record["op"]], task, version)
+
+    # ---------- search ----------
+    def _index_changes(self, records, results, before, after):
+        with self._search_lock:
+            if self.search_index is None or self._search_version != before:
+                return  # stale anyway, the next search rebuilds it
+            for record, task in zip(records, results):
+                if record["op"] == "delete":
+                    self.search_index.remove(task["id"])
+                else:
+                    self.search_index.add(task["id"], task["task"])
+            self._search_version = after
+
+    def _refresh_search(self):
+        with self._search_lock:
+            if self.search_index is not None and self._search_version == self.version:
+                return
+            cur = self.conn.cursor()
+            cur.execute("BEGIN")  # version and rows from the same snapshot
+            version = self._read_version(cur)
+            rows = cur.execute("SELECT * FROM tasks").fetchall()
+            cur.execute("COMMIT")
+            self.search_index = TaskSearchIndex.build((row[0], row[1]) for row in rows)
+            self._search_version = version
+
+    def search(self, query, limit=20):
+        self._refresh_search()
+        ranked = self.search_index.search(query, limit)
+        if not ranked:
+            return []
+        placeholders = ", ".join("?" for _ in ranked)
+        rows = self.conn.execute(
+            f"SELECT * FROM tasks WHERE id IN ({placeholders})", [task_id for task_id, _ in ranked]
+        ).fetchall()
+        found = {row[0]: _row_to_task(row) for row in rows}
+        return [(found[task_id], score) for task_id, score in ranked if task_id in found]
+
+    # ---------- lookups ----------
+    def get(self, task_id):
+        row = self.conn.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return _row_to_task(row) if row else None
+
+    def id_at(self, position):
+        if position < 1:
+            return None
+        row = self.conn.execute(
+            "SELECT id FROM tasks ORDER BY id LIMIT 1 OFFSET ?", (position - 1,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def page(self, limit, cursor=None, priority=None, completed=None):
+        query, params = "SELECT * FROM tasks WHERE id > ?", [cursor or 0]
+        if priority is not None:
+            query += " AND priority = ?"
+            params.append(priority)
+        if completed is not None:
+            query += " AND completed = ?"
+            params.append(int(completed))
+        query += " ORDER BY id LIMIT ?"
+        params.append(limit + 1)  # one extra row tells whether there is a next page
+        rows = self.conn.execute(query, params).fetchall()
+        page = [_row_to_task(row) for row in rows[:limit]]
+        next_cursor = page[-1]["id"] if len(rows) > limit else None
+        return page, next_cursor
+
+    def all(self):
+        return [_row_to_task(row) for row in self.conn.execute("SELECT * FROM tasks ORDER BY id")]
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+    def sync(self, timeout=None):
+        return True  # every transaction is already committed to the WAL
+
+    @property
+    def version(self):
+        return self.conn.execute("SELECT version FROM tasks_version WHERE id = 1").fetchone()[0]
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def migrate_json(snapshot_file=SNAPSHOT_FILE, journal_file=JOURNAL_FILE, db_file=DB_FILE, conn=None):
+    """Import tasks.json and its journal tail into the SQLite tasks table, keeping ids."""
+    source = TaskStore(snapshot_file, journal_file)
+    source.replay()
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(db_file, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    conn.execute("BEGIN IMMEDIATE")
+    conn.executemany(
+        "INSERT OR REPLACE INTO tasks (id, task, priority, completed) VALUES (?, ?, ?, ?)",
+        (
+            (t["id"], t.get("task", ""), t.get("priority", "Medium"), int(bool(t.get("completed"))))
+            for t in source.all()
+        ),
+    )
+    conn.execute("COMMIT")
+    if own_conn:
+        conn.close()
+    return len(source)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    snapshot = args[0] if args else SNAPSHOT_FILE
+    db = args[1] if len(args) > 1 else DB_FILE
+    journal = os.path.join(os.path.dirname(snapshot), os.path.basename(JOURNAL_FILE))
+    count = migrate_json(snapshot, journal, db)
+    print(f"Imported {count} tasks from {snapshot} into {db}")
@@ -0,0 +1,645 @@
+# journaled storage for the to-do list
+#
+# Every mutation is appended to a small journal file instead of rewriting the
+# whole task list. Once the journal grows past a threshold, a background thread
+# folds it into a snapshot. Startup loads the snapshot and replays the journal
+# tail on top of it.
+#
+# Request threads only change memory under the store lock and queue journal
+# lines; a dedicated writer thread appends them in groups (see _writer_loop).
+#
+# Tasks are addressed by a durable integer id. The id -> record dict doubles as
+# the order structure: it keeps insertion order and gives O(1) lookup and
+# delete. List positions are only resolved for the legacy positional endpoints.
+#
+# Because ids only ever grow, list order is id order. Sorted id lists therefore
+# serve as the order index and as the per-priority, per-status and combined
+# (priority, status) secondary indexes: a page is one bisect on the cursor plus
+# a slice of the one index matching the filters, whatever the list size. Deleting from them is a memmove of machine words, which stays cheap.
+#
+# Tasks are held as __slots__ TaskRecord objects rather than dicts, and the
+# snapshot is parsed a chunk at a time, so loading a large list never holds the
+# whole file text plus a dict per task at once. The router wraps the store in
+# LazyStore, so nothing is read until the first request needs it.
+import json
+import os
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+
+from WorkSphere.todo_search import TaskSearchIndex
+
+SNAPSHOT_FILE = "tasks.json"
+JOURNAL_FILE = "tasks.journal"
+COMPACT_THRESHOLD = 1000  # journal records before a compaction is triggered
+FLUSH_INTERVAL = 0.05     # seconds the writer thread waits to group journal records
+MAX_RETRY_DELAY = 5.0     # cap of the writer's backoff after a failed journal write
+READ_CHUNK = 1 << 16      # bytes read per step while streaming the snapshot
+_WHITESPACE = re.compile(r"[ \t\r\n]*")
+
+# journal operation -> change event type published to listeners
+CHANGE_KINDS = {"add": "added", "update": "updated", "delete": "deleted"}
+
+# storage backend for the to-do router: "json" (default) or "sqlite"
+BACKEND = os.environ.get("WORKSPHERE_TODO_BACKEND", "json").lower()
+
+
+class JournalWriteError(Exception):
+    """The journal could not be written; changes are kept in memory and retried."""
+
+
+class BatchError(Exception):
+    """A batched operation failed; nothing from the batch was applied."""
+
+    def __init__(self, index, reason):
+        super().__init__(reason)
+        self.index = index
+        self.reason = reason
+
+
+class TaskRecord:
+    """One task in memory; __slots__ keeps it several times smaller than a dict."""
+
+    __slots__ = ("id", "task", "priority", "completed")
+    FIELDS = ("task", "priority", "completed")
+
+    def __init__(self, id, task, priority="Medium", completed=False):
+        self.id = id
+        self.task = task
+        self.priority = sys.intern(priority)  # a handful of distinct values
+        self.completed = bool(completed)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["id"], data.get("task", ""), data.get("priority", "Medium"),
+                   data.get("completed", False))
+
+    def update(self, fields):
+        for name, value in fields.items():
+            if name == "priority":
+                value = sys.intern(value)
+            elif name == "completed":
+                value = bool(value)
+            elif name not in self.FIELDS:
+                continue
+            setattr(self, name, value)
+
+    def copy(self):
+        return TaskRecord(self.id, self.task, self.priority, self.completed)
+
+    def to_dict(self):
+        return {"task": self.task, "priority": self.priority, "completed": self.completed, "id": self.id}
+
+
+class _JsonStream:
+    """Pull JSON values out of a file a chunk at a time."""
+
+    _decoder = json.JSONDecoder()
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+
+    def _fill(self):
+        chunk = self.f.read(READ_CHUNK)
+        if not chunk:
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        # next non-whitespace character, "" at end of file
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Malformed snapshot: expected {char!r} at offset {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            if end == len(self.buf) and self._fill():
+                continue  # a number may go on in the next chunk
+            self.pos = end
+            return value
+
+    def array(self):
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            char = self.peek()
+            self.expect(char if char in ",]" else ",")
+            if char == "]":
+                return
+
+
+def _stream_snapshot(f, meta):
+    """Yield the task dicts of a snapshot file, storing its other keys in `meta`."""
+    stream = _JsonStream(f)
+    first = stream.peek()
+    if first == "[":  # legacy format written by save_tasks()
+        yield from stream.array()
+        return
+    if first == "":
+        return
+    stream.expect("{")
+    while stream.peek() != "}":
+        key = stream.value()
+        stream.expect(":")
+        if key == "tasks":
+            yield from stream.array()
+        else:
+            meta[key] = stream.value()
+        if stream.peek() == ",":
+            stream.expect(",")
+    stream.expect("}")
+
+
+class TaskStore:
+    def __init__(self, snapshot_file=SNAPSHOT_FILE, journal_file=JOURNAL_FILE,
+                 compact_threshold=COMPACT_THRESHOLD, flush_interval=FLUSH_INTERVAL):
+        self.snapshot_file = snapshot_file
+        self.journal_file = journal_file
+        self.rotated_file = journal_file + ".1"  # journal being folded by a compaction
+        self.compact_threshold = compact_threshold
+        self.flush_interval = flush_interval
+        self.tasks = {}         # task id -> TaskRecord, in list order
+        self.order = []         # all task ids, ascending (= list order)
+        self.by_priority = defaultdict(list)    # priority -> sorted task ids
+        self.by_status = {True: [], False: []}  # completed -> sorted task ids
+        self.by_priority_status = defaultdict(list)  # (priority, completed) -> sorted task ids
+        self.search_index = None  # full-text index, built by the first search
+        self.listeners = []       # callables(kind, task dict, version) run after each change
+        self.next_id = 1
+        self.seq = 0            # sequence number of the last applied record
+        self.journal_records = 0
+        self._lock = threading.RLock()
+        self._changed = threading.Condition(self._lock)  # new records / records flushed
+        self._pending = []      # journal lines waiting for the writer thread
+        self._durable_seq = 0   # last sequence number known to be on disk
+        self.write_error = None # OSError of the last journal write, None once one succeeds
+        self._closing = False
+        self._journal = None    # only touched by the writer thread once it runs
+        self._writer = None
+        self._compactor = None
+
+    # ---------- loading ----------
+    def replay(self):
+        # rebuild the in-memory state from disk without opening the journal
+        self.search_index = None  # rebuilt in one pass on first search, not per record
+        self._read_snapshot()
+        self.journal_records = 0
+        for path in (self.rotated_file, self.journal_file):
+            for record in self._read_journal(path):
+                if record["seq"] <= self.seq:
+                    continue  # already folded into the snapshot
+                self._apply(record)
+                self.seq = record["seq"]
+                self.journal_records += 1
+        return self.tasks
+
+    def load(self):
+        with self._lock:
+            self.replay()
+            self._durable_seq = self.seq
+            self._closing = False
+            self._journal = open(self.journal_file, "a", encoding="utf-8")
+            if os.path.exists(self.rotated_file):
+                # a previous compaction was interrupted, finish it now
+                self._start_compaction()
+        if self._compactor is not None:
+            self._compactor.join()
+        self._writer = threading.Thread(target=self._writer_loop, name="todo-journal-writer", daemon=True)
+        self._writer.start()
+        return self.tasks
+
+    def _read_snapshot(self):
+        self.tasks, self.next_id, self.seq = {}, 1, 0
+        self.order = []
+        self.by_priority = defaultdict(list)
+        self.by_status = {True: [], False: []}
+        self.by_priority_status = defaultdict(list)
+        meta = {}
+        try:
+            with open(self.snapshot_file, "r", encoding="utf-8") as f:
+                for data in _stream_snapshot(f, meta):
+                    if "id" not in data:  # tasks saved before ids existed
+                        data["id"] = self.next_id
+                    task = TaskRecord.from_dict(data)
+                    self.tasks[task.id] = task
+                    self._index(task)
+                    self.next_id = max(self.next_id, task.id + 1)
+        except FileNotFoundError:
+            return
+        self.next_id = max(self.next_id, meta.get("next_id", 1))
+        self.seq = meta.get("seq", 0)
+
+    @staticmethod
+    def _read_journal(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        # torn write from a crash, nothing after it was acknowledged
+                        return
+        except FileNotFoundError:
+            return
+
+    # ---------- secondary indexes ----------
+    @staticmethod
+    def _insert_id(ids, task_id):
+        if not ids or ids[-1] < task_id:
+            ids.append(task_id)  # the common case, new ids are the largest
+        else:
+            insort(ids, task_id)
+
+    @staticmethod
+    def _remove_id(ids, task_id):
+        i = bisect_left(ids, task_id)
+        if i < len(ids) and ids[i] == task_id:
+            del ids[i]
+
+    def _index(self, task):
+        self._insert_id(self.order, task.id)
+        self._insert_id(self.by_priority[task.priority], task.id)
+        self._insert_id(self.by_status[task.completed], task.id)
+        self._insert_id(self.by_priority_status[task.priority, task.completed], task.id)
+        if self.search_index is not None:
+            self.search_index.add(task.id, task.task)
+
+    def _unindex(self, task):
+        self._remove_id(self.order, task.id)
+        self._remove_id(self.by_priority[task.priority], task.id)
+        self._remove_id(self.by_status[task.completed], task.id)
+        self._remove_id(self.by_priority_status[task.priority, task.completed], task.id)
+        if self.search_index is not None:
+            self.search_index.remove(task.id)
+
+    # ---------- mutations ----------
+    def _apply(self, record):
+        op = record["op"]
+        if "index" in record:  # positional record written before ids existed
+            record["id"] = self.id_at(record.pop("index") + 1)
+        if op == "add":
+            record["task"].setdefault("id", self.next_id)
+            task = TaskRecord.from_dict(record["task"])
+            self.tasks[task.id] = task
+            self._index(task)
+            self.next_id = max(self.next_id, task.id + 1)
+            return task
+        elif op == "delete":
+            task = self.tasks.pop(record["id"])
+            self._unindex(task)
+            return task
+        elif op == "update":
+            task = self.tasks[record["id"]]
+            self._unindex(task)
+            task.update(record["fields"])
+            self._index(task)
+            return task
+        elif op == "batch":
+            return [self._apply(sub) for sub in record["ops"]]
+        else:
+            raise ValueError(f"Unknown journal operation: {op}")
+
+    def _append(self, record):
+        # caller holds the lock and has already applied the record; the writer
+        # thread picks the line up with the next group commit
+        self.seq += 1
+        record["seq"] = self.seq
+        self._pending.append(json.dumps(record, separators=(",", ":")) + "\n")
+        self.journal_records += 1
+        self._changed.notify_all()
+
+    def _notify(self, records, results):
+        # caller holds the lock, so listeners see changes in commit order
+        for record, task in zip(records, results):
+            for listener in self.listeners:
+                listener(CHANGE_KINDS[record["op"]], task, self.seq)
+
+    def _commit(self, record):
+        with self._lock:
+            try:
+                result = self._apply(record)
+            except KeyError:
+                return None  # the task is gone, e.g. deleted by a concurrent request
+            self._append(record)
+            result = result.to_dict()
+            self._notify([record], [result])
+            return result
+
+    def _undo(self, record, before, next_id):
+        # reverse one applied record; `before` is the task as it was
+        self.next_id = next_id
+        if record["op"] == "add":
+            self._unindex(self.tasks.pop(record["task"]["id"]))
+        elif record["op"] == "delete":
+            self.tasks[before.id] = before
+            self._index(before)
+        elif record["op"] == "update":
+            self._unindex(self.tasks[before.id])
+            self.tasks[before.id] = before
+            self._index(before)
+
+    def apply_batch(self, records):
+        """Apply records all-or-nothing and journal them as a single entry.
+
+        Raises BatchError (with the failing record's index) after rolling back
+        every record of the batch that was already applied.
+        """
+        with self._lock:
+            applied, results = [], []
+            for index, record in enumerate(records):
+                next_id = self.next_id
+                before = self.tasks.get(record.get("id"))
+                before = before.copy() if before is not None else None
+                try:
+                    results.append(self._apply(record).to_dict())
+                except (KeyError, ValueError) as e:
+                    for done in reversed(applied):
+                        self._undo(*done)
+                    reason = f"task {record.get('id')} not found" if isinstance(e, KeyError) else str(e)
+                    raise BatchError(index, reason) from None
+                applied.append((record, before, next_id))
+
+            # one journal line, so a torn write drops the whole batch on replay
+            self._append({"op": "batch", "ops": records})
+            self._notify(records, results)
+            return results
+
+    def add(self, task):
+        # the id is assigned by _apply(), so it is journaled with the record
+        return self._commit({"op": "add", "task": dict(task)})
+
+    def delete(self, task_id):
+        return self._commit({"op": "delete", "id": task_id})
+
+    def update(self, task_id, **fields):
+        return self._commit({"op": "update", "id": task_id, "fields": fields})
+
+    # ---------- lookups ----------
+    # Readers take the lock too and get copies, so a response is never
+    # serialized while another request is changing the same record.
+    def get(self, task_id):
+        with self._lock:
+            task = self.tasks.get(task_id)
+            return task.to_dict() if task is not None else None
+
+    def id_at(self, position):
+        # 1-based list position -> task id, for the positional endpoints
+        with self._lock:
+            if not 0 < position <= len(self.order):
+                return None
+            return self.order[position - 1]
+
+    def page(self, limit, cursor=None, priority=None, completed=None):
+        """Return (tasks, next_cursor) for ids after `cursor` matching the filters."""
+        with self._lock:
+            # every id in the chosen index matches, so a page is O(limit)
+            if priority is not None and completed is not None:
+                ids = self.by_priority_status.get((priority, completed), [])
+            elif priority is not None:
+                ids = self.by_priority.get(priority, [])
+            elif completed is not None:
+                ids = self.by_status[completed]
+            else:
+                ids = self.order
+            start = bisect_right(ids, cursor) if cursor is not None else 0
+            window = ids[start:start + limit + 1]  # one extra id tells whether there is a next page
+            page = [self.tasks[task_id].to_dict() for task_id in window[:limit]]
+            next_cursor = page[-1]["id"] if len(window) > limit else None
+            return page, next_cursor
+
+    def search(self, query, limit=20):
+        """Return [(task, score)] ranked by relevance to `query`."""
+        with self._lock:
+            if self.search_index is None:
+                self.search_index = TaskSearchIndex.build((t.id, t.task) for t in self.tasks.values())
+            return [(self.tasks[task_id].to_dict(), score)
+                    for task_id, score in self.search_index.search(query, limit)]
+
+    def all(self):
+        with self._lock:
+            return [self.tasks[task_id].to_dict() for task_id in self.order]
+
+    @property
+    def version(self):
+        # every mutation gets the next journal sequence number
+        return self.seq
+
+    def __len__(self):
+        return len(self.tasks)
+
+    # ---------- group commit ----------
+    def _writer_loop(self):
+        # Coalesce every record that arrives within flush_interval of the first
+        # one into a single write + fsync. A burst of requests therefore costs
+        # one disk flush per interval, and no acknowledged write waits longer
+        # than about one interval to become durable. A failed write is retried
+        # with exponential backoff; the thread never dies on an I/O error.
+        delay = self.flush_interval
+        while True:
+            with self._lock:
+                self._changed.wait_for(lambda: self._pending or self._closing)
+                if self._closing and not self._pending:
+                    return
+                closing = self._closing
+            if not closing:
+                time.sleep(self.flush_interval)
+            if self._flush():
+                delay = self.flush_interval
+            elif closing:
+                return  # close() writes a snapshot of the in-memory state instead
+            else:
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+
+    def _flush(self):
+        """Write the pending lines; on an I/O error put them back and return False."""
+        with self._lock:
+            lines, self._pending = self._pending, []
+            seq = self.seq
+        if lines:
+            size = None
+            try:
+                if self._journal.closed:  # an earlier failure could not reopen it
+                    self._journal = open(self.journal_file, "a", encoding="utf-8")
+                size = os.fstat(self._journal.fileno()).st_size  # everything before is flushed
+                self._journal.write("".join(lines))
+                self._journal.flush()
+                os.fsync(self._journal.fileno())
+            except OSError as e:
+                self._discard_failed_write(size)
+                with self._lock:
+                    self._pending[:0] = lines  # ahead of records queued meanwhile
+                    self.write_error = e
+                    self._changed.notify_all()  # sync() callers report the error
+                return False
+        with self._lock:
+            self.write_error = None
+            self._durable_seq = max(self._durable_seq, seq)
+            self._changed.notify_all()
+            if self.journal_records >= self.compact_threshold:
+                self._start_compaction()
+        return True
+
+    def _discard_failed_write(self, size):
+        # drop whatever part of the failed group reached the file (a torn line
+        # would end replay there) and any of it still in the write buffer
+        try:
+            self._journal.close()
+        except OSError:
+            pass  # the buffer could not be flushed either; the file is closed anyway
+        try:
+            if size is not None:
+                os.truncate(self.journal_file, size)
+            self._journal = open(self.journal_file, "a", encoding="utf-8")
+        except OSError:
+            pass  # retried with the group; replay skips records it has already seen
+
+    def sync(self, timeout=None):
+        """Block until every record applied so far has been flushed to disk.
+
+        Returns False on timeout; raises JournalWriteError if the journal
+        write is failing (the records stay queued and are retried).
+        """
+        with self._lock:
+            target = self.seq
+            durable = self._changed.wait_for(
+                lambda: self._durable_seq >= target or self.write_error is not None, timeout
+            )
+            if self._durable_seq >= target:
+                return True
+            if self.write_error is not None:
+                raise JournalWriteError(f"Could not write the task journal: {self.write_error}")
+            return durable
+
+    # ---------- compaction ----------
+    def _start_compaction(self):
+        # caller holds the lock, and is the writer thread (or no writer runs)
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        if not os.path.exists(self.rotated_file):
+            # new writes go to a fresh journal while the old one is folded
+            self._journal.close()
+            os.replace(self.journal_file, self.rotated_file)
+            self._journal = open(self.journal_file, "a", encoding="utf-8")
+            self.journal_records = 0
+        state = [self.tasks[task_id].copy() for task_id in self.order]
+        self._compactor = threading.Thread(
+            target=self._write_snapshot, args=(state, self.next_id, self.seq), daemon=True
+        )
+        self._compactor.start()
+
+    def _write_snapshot(self, tasks, next_id, seq):
+        # one task per line, so the streaming reader never needs a big buffer
+        tmp_path = self.snapshot_file + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(f'{{"seq": {seq}, "next_id": {next_id}, "tasks": [')
+            for i, task in enumerate(tasks):
+                f.write((",\n" if i else "\n") + json.dumps(task.to_dict()))
+            f.write("\n]}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_file)
+        os.remove(self.rotated_file)
+
+    def close(self):
+        with self._lock:
+            if self._journal is None:
+                return
+            self._closing = True
+            self._changed.notify_all()
+        if self._writer is not None:
+            self._writer.join()
+            self._writer = None
+        self._flush()
+        with self._lock:
+            self._start_compaction()
+        if self._compactor is not None:
+            self._compactor.join()
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+
+def open_store(backend=None):
+    """Create and load the task store selected by WORKSPHERE_TODO_BACKEND."""
+    backend = (backend or BACKEND).lower()
+    if backend == "json":
+        store = TaskStore()
+    elif backend == "sqlite":
+        from WorkSphere.todo_sqlite import SqliteTaskStore
+        store = SqliteTaskStore()
+    else:
+        raise ValueError(f"Unknown to-do storage backend: {backend!r} (expected 'json' or 'sqlite')")
+    store.load()
+    return store
+
+
+class LazyStore:
+    """Open the real store on first use, so importing the router costs nothing.
+
+    open_in_background() can start loading early (e.g. on app startup); a
+    request that arrives before it finishes simply waits for it.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._store = None
+        self._lock = threading.Lock()
+        self._loader = None
+
+    def _get(self):
+        store = self._store
+        if store is None:
+            with self._lock:
+                if self._store is None:
+                    self._store = self._factory()
+                store = self._store
+        return store
+
+    def open_in_background(self):
+        with self._lock:
+            if self._store is not None or self._loader is not None:
+                return
+            self._loader = threading.Thread(target=self._get, name="todo-store-loader", daemon=True)
+            self._loader.start()
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+    def __len__(self):
+        return len(self._get())
+
+    def close(self):
+        if self._loader is not None:
+            self._loader.join()
+        if self._store is not None:
+            self._store.close()
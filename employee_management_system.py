@@ -1,65 +1,45 @@
 # employee management system
-import sqlite3
+from WorkSphere.employee_store import EmployeeStore, EDITABLE_FIELDS
 
-# estaiblishing connection with DB
-conn = sqlite3.connect("employees.db")
-cursor = conn.cursor()
-
-# creating table structure in database
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS employees (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    name TEXT NOT NULL,
-    age INTEGER,
-    department TEXT,
-    salary INTEGER
-)
-""")
-
-conn.commit()
+# estaiblishing connection with DB (same schema, indexes and settings as the API)
+store = EmployeeStore().init_schema().open()
 
 # CRUD operations
 def add_employee(name, age, department, salary):
     try:
-        cursor.execute("INSERT INTO employees (name, age, department, salary) VALUES (?, ?, ?, ?)", 
-                    (name, age, department, salary))
-        conn.commit()
+        store.add(name, age, department, salary)
         print("employee added successfully!")
     except Exception as e:
         print("Error:", e)
 
+def print_rows(rows):
+    for row in rows:
+        print(f"ID: {row[0]}, Name: {row[1]}, Age: {row[2]}, Dept: {row[3]}, Salary: {row[4]}")
+
 def view_employees(department=None):
     try:
-        if department:
-            cursor.execute("SELECT * FROM employees WHERE department = ?", (department,))
-        else:
-            cursor.execute("SELECT * FROM employees")
-        rows = cursor.fetchall()
-        if rows:
-            for row in rows:
-                print(f"ID: {row[0]}, Name: {row[1]}, Age: {row[2]}, Dept: {row[3]}, Salary: {row[4]}")
-        else:
+        # read in batches so a big table is printed without loading it all
+        found = False
+        for rows in store.stream(department=department):
+            found = True
+            print_rows(rows)
+        if not found:
             print("no employees found!")
     except Exception as e:
         print("Error:", e)
 
 def update_employee(emp_id, field, new_value):
     try:
-        allowed_fields = ["name", "age", "department", "salary"]
-        if field not in allowed_fields:
+        if field not in EDITABLE_FIELDS:
             print("invalid field!")
             return
-        
-        cursor.execute("SELECT * FROM employees WHERE id = ?", (emp_id,))
-        if not cursor.fetchone():  
-            print("No employee found with this ID")
-            return
-        
+
         if field in ["age", "salary"]:
             new_value = int(new_value)
 
-        cursor.execute(f"UPDATE employees SET {field} = ? WHERE id = ?", (new_value, emp_id))
-        conn.commit()
+        if store.update(emp_id, {field: new_value}) is None:
+            print("No employee found with this ID")
+            return
         print("employee updated successfully!")
 
     except Exception as e:
@@ -67,20 +47,16 @@ def update_employee(emp_id, field, new_value):
 
 def delete_employee(emp_id):
     try:
-        cursor.execute("DELETE FROM employees WHERE id = ?", (emp_id,))
-        conn.commit()
+        store.delete(emp_id)
         print("employee deleted successfully!")
     except Exception as e:
         print("Error:", e)
 
 def search_employee(keyword):
     try:
-        cursor.execute("SELECT * FROM employees WHERE LOWER(name) LIKE LOWER(?) OR LOWER(department) LIKE LOWER(?)", 
-                   ('%' + keyword + '%', '%' + keyword + '%'))
-        rows = cursor.fetchall()
+        rows = store.search(keyword)
         if rows:
-            for row in rows:
-                print(f"ID: {row[0]}, Name: {row[1]}, Age: {row[2]}, Dept: {row[3]}, Salary: {row[4]}")
+            print_rows(rows)
         else:
             print("No match found!")
     except Exception as e:
@@ -126,6 +102,6 @@ while True:
     else:
         print("incorrect choice, choose again.")
 
-conn.close()
+store.close()
 
 
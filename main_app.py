@@ -5,6 +5,7 @@ import requests
 import threading
 import json
 import os
+import time
 
 # URL where API is running
 BASE_URL = "http://127.0.0.1:8000"
@@ -149,33 +150,117 @@ class WorkSphereApp(tk.Tk):
 
         # Scrollable Output Box
         output_container = ttk.Frame(frame)
-        output_container.grid(row=2, column=0, sticky="nsew", padx=14, pady=(10, 14))
+        output_container.grid(row=2, column=0, sticky="nsew", padx=14, pady=(10, 4))
         self.todo_output = self.create_output_box(output_container, height=15)
 
-        # Initial load of tasks
+        # Result of the last action (the list itself is patched live)
+        self.todo_status = ttk.Label(frame, text="", foreground="#555555")
+        self.todo_status.grid(row=3, column=0, sticky="w", padx=28, pady=(0, 10))
+
+        # Initial load of tasks, then follow the server's change feed
+        self._task_feed_live = False
         self.load_tasks()
+        self._start_task_feed()
+
+    # -----------------------
+    def _task_text(self, t):
+        status = "Completed" if t.get("completed") else "Pending"
+        return f"#{t['id']}  Task: {t['task']}  |  Priority: {t['priority']}  |  Status: {status}\n{'-'*70}\n\n"
+
+    def _set_todo_status(self, message):
+        self.after(0, lambda: self.todo_status.config(text=message))
 
-    # -----------------------  
     @run_in_thread
     def _api_get_tasks(self):
-        res = requests.get(f"{BASE_URL}/todo/")
+        # conditional GET: the server answers 304 while the list is unchanged
+        etag, cached = getattr(self, "_tasks_cache", (None, None))
+        headers = {"If-None-Match": etag} if etag else {}
+        res = requests.get(f"{BASE_URL}/todo/", headers=headers)
+        if res.status_code == 304:
+            return cached
         res.raise_for_status()
-        return res.json()
+        result = res.json()
+        self._tasks_cache = (res.headers.get("ETag"), result)
+        return result
 
     def load_tasks(self):
         def cb(result):
+            if result is getattr(self, "_tasks_rendered", None):
+                # 304 Not Modified, what is on screen is still current
+                self.refresh_btn.state(["disabled"])
+                return
+            self._tasks_rendered = result
             self.todo_output.delete("1.0", tk.END)
+            for tag in self.todo_output.tag_names():
+                if tag.startswith("task-"):
+                    self.todo_output.tag_delete(tag)
             if isinstance(result, dict) and "message" in result:
+                self._tasks_empty = True
                 self.todo_output.insert(tk.END, result["message"])
                 return
-            for i, t in enumerate(result, start=1):
-                self.todo_output.insert(
-                    tk.END,
-                    f"{i}. Task: {t['task']}  |  Priority: {t['priority']}  |  Status: {'Completed' if t.get('completed') else 'Pending'}\n{'-'*70}\n\n"
-                )
+            self._tasks_empty = False
+            for t in result:
+                self.todo_output.insert(tk.END, self._task_text(t), (f"task-{t['id']}",))
             self.refresh_btn.state(["disabled"])
         self._api_get_tasks(callback=cb)
 
+    # -----------------------
+    def _start_task_feed(self):
+        """Follow GET /todo/events and patch the task view as changes arrive."""
+        def listen():
+            while True:
+                try:
+                    with requests.get(f"{BASE_URL}/todo/events", stream=True, timeout=(5, 60)) as res:
+                        res.raise_for_status()
+                        event, data = None, []
+                        for line in res.iter_lines(decode_unicode=True):
+                            if line.startswith("event:"):
+                                event = line[6:].strip()
+                            elif line.startswith("data:"):
+                                data.append(line[5:].strip())
+                            elif not line and event:
+                                payload = json.loads("\n".join(data)) if data else {}
+                                self.after(0, self._apply_task_event, event, payload)
+                                event, data = None, []
+                except Exception:
+                    pass  # backend not up yet or connection dropped, retry below
+                self._task_feed_live = False
+                time.sleep(3)
+        threading.Thread(target=listen, daemon=True).start()
+
+    def _apply_task_event(self, event, payload):
+        if event in ("hello", "reset"):
+            # (re)connected or fell behind: catch up with one conditional GET
+            self._task_feed_live = True
+            self.load_tasks()
+            return
+
+        task = payload.get("task") or {}
+        tag = f"task-{task.get('id')}"
+        ranges = self.todo_output.tag_ranges(tag)
+        if event == "deleted":
+            if ranges:
+                self.todo_output.delete(ranges[0], ranges[1])
+                self.todo_output.tag_delete(tag)
+            if not self.todo_output.get("1.0", "end-1c").strip():
+                self._tasks_empty = True
+                self.todo_output.insert(tk.END, "No tasks in the list.")
+            return
+
+        if getattr(self, "_tasks_empty", False):
+            self.todo_output.delete("1.0", tk.END)
+            self._tasks_empty = False
+        if ranges:  # updated in place
+            self.todo_output.delete(ranges[0], ranges[1])
+            self.todo_output.insert(ranges[0], self._task_text(task), (tag,))
+        else:  # added (or an update for a task we have not seen yet)
+            self.todo_output.insert(tk.END, self._task_text(task), (tag,))
+
+    def _after_task_change(self, message):
+        self._set_todo_status(message)
+        if not self._task_feed_live:
+            self.after(0, self.load_tasks)  # no live feed, fall back to a reload
+
     # --------------------------
     @run_in_thread
     def _api_add_task(self, task, priority, completed):
@@ -191,65 +276,60 @@ class WorkSphereApp(tk.Tk):
             messagebox.showwarning("Input", "Type a task first!")
             return
         def cb(result):
-            self.todo_output.insert(tk.END, f"\n{result.get('message', str(result))}\n")
             self.todo_entry.delete(0, tk.END)
-            self.refresh_btn.state(["!disabled"])  
-            self.load_tasks()  # Real-time reload
+            self.refresh_btn.state(["!disabled"])
+            self._after_task_change(result.get("message", str(result)))
         self._api_add_task(txt, priority, status, callback=cb)
 
     # ----------------------------
     def delete_task(self):
-        task_num = simpledialog.askinteger("Delete Task", "Enter task number to delete:")
-        if not task_num:
+        task_id = simpledialog.askinteger("Delete Task", "Enter task ID (#) to delete:")
+        if not task_id:
             return
         @run_in_thread
         def api_delete():
-            res = requests.delete(f"{BASE_URL}/todo/delete/{task_num}")
-            self.todo_output.insert(tk.END, f"\n{res.json().get('message', res.text)}\n")
+            res = requests.delete(f"{BASE_URL}/todo/tasks/{task_id}")
             self.refresh_btn.state(["!disabled"])
-            self.load_tasks()  # Reload
+            self._after_task_change(res.json().get("message", res.json().get("detail", res.text)))
         api_delete()
 
     # -----------------------------
     def edit_task(self):
-        task_num = simpledialog.askinteger("Edit Task", "Enter task number:")
+        task_id = simpledialog.askinteger("Edit Task", "Enter task ID (#):")
         new_task = simpledialog.askstring("Edit Task", "Enter new task description(name):")
         new_priority = simpledialog.askstring("Edit Task", "Enter new priority (High/Medium/Low):")
-        if not all([task_num, new_task, new_priority]):
+        if not all([task_id, new_task, new_priority]):
             return
         @run_in_thread
         def api_edit():
-            res = requests.put(f"{BASE_URL}/todo/edit/{task_num}?new_task={new_task}&new_priority={new_priority}")
-            self.todo_output.insert(tk.END, f"\n{res.json().get('message', res.text)}\n")
+            res = requests.put(f"{BASE_URL}/todo/tasks/{task_id}/edit", params={"new_task": new_task, "new_priority": new_priority})
             self.refresh_btn.state(["!disabled"])
-            self.load_tasks()  
+            self._after_task_change(res.json().get("message", res.json().get("detail", res.text)))
         api_edit()
 
     # -------------------------------
     def mark_complete(self):
-        task_num = simpledialog.askinteger("Mark Complete", "Enter task number:")
-        if not task_num:
+        task_id = simpledialog.askinteger("Mark Complete", "Enter task ID (#):")
+        if not task_id:
             return
         @run_in_thread
         def api_done():
-            res = requests.put(f"{BASE_URL}/todo/complete/{task_num}")
-            self.todo_output.insert(tk.END, f"\n{res.json().get('message', res.text)}\n")
+            res = requests.put(f"{BASE_URL}/todo/tasks/{task_id}/complete")
             self.refresh_btn.state(["!disabled"])
-            self.load_tasks()
+            self._after_task_change(res.json().get("message", res.json().get("detail", res.text)))
         api_done()
 
     # ---------------------------------
     def set_priority(self):
-        task_num = simpledialog.askinteger("Set Priority", "Enter task number:")
+        task_id = simpledialog.askinteger("Set Priority", "Enter task ID (#):")
         new_priority = simpledialog.askstring("Set Priority", "Enter new priority (High/Medium/Low):")
-        if not all([task_num, new_priority]):
+        if not all([task_id, new_priority]):
             return
         @run_in_thread
         def api_priority():
-            res = requests.put(f"{BASE_URL}/todo/priority/{task_num}?new_priority={new_priority}")
-            self.todo_output.insert(tk.END, f"\n{res.json().get('message', res.text)}\n")
+            res = requests.put(f"{BASE_URL}/todo/tasks/{task_id}/priority", params={"new_priority": new_priority})
             self.refresh_btn.state(["!disabled"])
-            self.load_tasks()
+            self._after_task_change(res.json().get("message", res.json().get("detail", res.text)))
         api_priority()
 
 
@@ -654,13 +734,25 @@ class WorkSphereApp(tk.Tk):
     # -----------------------------------
     @run_in_thread
     def _api_get_employees(self):
-        res = requests.get(f"{BASE_URL}/employees/")
+        # conditional GET: the server answers 304 while the table is unchanged
+        etag, cached = getattr(self, "_employees_cache", (None, None))
+        headers = {"If-None-Match": etag} if etag else {}
+        res = requests.get(f"{BASE_URL}/employees/", headers=headers)
+        if res.status_code == 304:
+            return cached
         res.raise_for_status()
-        return res.json()
+        result = res.json()
+        self._employees_cache = (res.headers.get("ETag"), result)
+        return result
 
     def load_employees(self):
         """Refresh employees list"""
         def cb(result):
+            if result is getattr(self, "_employees_rendered", None):
+                # 304 Not Modified, what is on screen is still current
+                self.refresh_btn.state(["disabled"])
+                return
+            self._employees_rendered = result
             self.emp_output.delete("1.0", tk.END)
             if isinstance(result, dict) and "__error__" in result:
                 self.emp_output.insert(tk.END, f"Failed to fetch employees:\n{result['__error__']}")
@@ -779,6 +871,7 @@ class WorkSphereApp(tk.Tk):
                     return
 
                 result = res.json()
+                self._employees_rendered = None  # the full list is no longer on screen
                 self.emp_output.delete("1.0", tk.END)
                 for e in result:
                     if isinstance(e, dict):
@@ -811,6 +904,7 @@ class WorkSphereApp(tk.Tk):
                 res = requests.get(url)
                 res.raise_for_status()
                 result = res.json()
+                self._employees_rendered = None  # the full list is no longer on screen
                 self.emp_output.delete("1.0", tk.END)
                 if not result:
                     self.emp_output.insert(tk.END, f"No employees found in '{dept}' department.\n")
@@ -860,7 +954,7 @@ class WorkSphereApp(tk.Tk):
             toolbar.grid_columnconfigure(i, weight=1)
 
         ttk.Button(toolbar, text="Upload File", command=self.upload_file, style="Accent.TButton").grid(row=0, column=0, padx=6, sticky="ew")
-        ttk.Button(toolbar, text="Export SQL : Excel", command=self.export_sql).grid(row=0, column=1, padx=6, sticky="ew")
+        ttk.Button(toolbar, text="Export SQL : CSV", command=self.export_sql).grid(row=0, column=1, padx=6, sticky="ew")
         ttk.Button(toolbar, text="Export Mongo : CSV", command=self.export_mongo).grid(row=0, column=2, padx=6, sticky="ew")
 
         # Separator Line 
@@ -891,17 +985,57 @@ class WorkSphereApp(tk.Tk):
                 res = requests.post(f"{BASE_URL}/files/upload", files=files)
             res.raise_for_status()
             result = res.json()
-            msg = result.get("message", str(result))
+            if "job_id" in result:
+                job_id = result["job_id"]
+                self.file_output.insert(tk.END, f"{result['message']} (job {job_id[:8]})\n")
+                self.file_output.insert(tk.END, "Waiting to start...\n", (f"job-{job_id}",))
+                self.file_output.see(tk.END)
+                # Ingestion runs in the background; show its progress until it finishes
+                while result.get("status") in ("queued", "running", "cancelling"):
+                    time.sleep(1)
+                    res = requests.get(f"{BASE_URL}/files/jobs/{job_id}", timeout=10)
+                    res.raise_for_status()
+                    result = res.json()
+                    self._show_upload_progress(job_id, result)
+            if "error" in result:
+                msg = f"Upload failed: {result['error']}"
+            else:
+                msg = result.get("message", str(result))
             self.file_output.insert(tk.END, f"{msg}\n")
             if "rows" in result:
                 self.file_output.insert(
                    tk.END,
-                   f"Rows: {result['rows']} | Columns: {', '.join(result['columns'])}\n",
+                   f"Rows: {result['rows']} | Columns: {', '.join(result['columns'] or [])}\n",
                 )
         except Exception as e:
             self.file_output.insert(tk.END, f"Upload failed: {str(e)}\n")
         self.file_output.see(tk.END)
 
+    def _upload_progress_text(self, job):
+        if job["status"] == "queued":
+            return "Waiting to start..."
+        written = job["rows_written"]
+        text = f"Parsed {job['rows_parsed']:,}"
+        if job["rows_total_estimate"]:
+            text += f" of ~{job['rows_total_estimate']:,}"
+        text += " rows"
+        if written:
+            text += " | " + ", ".join(f"{sink}: {rows:,}" for sink, rows in written.items())
+        if job["rows_per_second"]:
+            text += f" | {job['rows_per_second']:,.0f} rows/s"
+        if job["eta_seconds"] is not None:
+            text += f" | ETA {job['eta_seconds']:.0f}s"
+        return text
+
+    # Replacing the job's progress line in place
+    def _show_upload_progress(self, job_id, job):
+        tag = f"job-{job_id}"
+        ranges = self.file_output.tag_ranges(tag)
+        if not ranges:
+            return
+        self.file_output.delete(ranges[0], ranges[1])
+        self.file_output.insert(ranges[0], self._upload_progress_text(job) + "\n", (tag,))
+
     def upload_file(self):
         path = filedialog.askopenfilename()
         if not path:
@@ -912,27 +1046,32 @@ class WorkSphereApp(tk.Tk):
 
     # -----------------------------------
     def export_sql(self):
-        self.file_output.insert(tk.END, "\nExporting SQL data to Excel...\n")
+        self.file_output.insert(tk.END, "\nExporting SQL data to CSV...\n")
         self.file_output.see(tk.END)
 
         @run_in_thread
         def api_export_sql():
             try:
-                res = requests.get(f"{BASE_URL}/files/export/sql")
-                if res.status_code == 200:
-                    filename = res.headers.get("content-disposition", "file.xlsx").split("filename=")[-1]
+                # The export is streamed, so it is written to disk as it arrives
+                with requests.get(f"{BASE_URL}/files/export/sql", stream=True, timeout=(5, 300)) as res:
+                    if res.status_code != 200 or res.headers.get("content-type", "").startswith("application/json"):
+                        self.file_output.insert(tk.END, f"Export failed: {res.text}\n")
+                        self.file_output.see(tk.END)
+                        return
+                    filename = res.headers.get("content-disposition", "file.csv").split("filename=")[-1]
 
                     # Asking where to save manually
                     save_path = filedialog.asksaveasfilename(
-                        defaultextension=".xlsx",
+                        defaultextension=".csv",
                         initialfile=filename,
-                        title="Save Exported Excel File"
+                        title="Save Exported CSV File"
                     )
 
                     # Save it if user chooses a location
                     if save_path:
                         with open(save_path, "wb") as f:
-                            f.write(res.content)
+                            for block in res.iter_content(chunk_size=1024 * 1024):
+                                f.write(block)
                         self.file_output.insert(tk.END, f"Exported SQL data!\nSaved as: {save_path}\n")
 
                         # Creating a clickable link too 
@@ -948,8 +1087,6 @@ class WorkSphereApp(tk.Tk):
                         )
                     else:
                         self.file_output.insert(tk.END, "Export canceled by user.\n")
-                else:
-                    self.file_output.insert(tk.END, f"Export failed: {res.text}\n")
 
             except Exception as e:
                 self.file_output.insert(tk.END, f"Error exporting SQL: {e}\n")
@@ -0,0 +1,55 @@
+# connections of threads that have exited are closed, not kept forever
+import sqlite3
+import threading
+
+import pytest
+
+from WorkSphere.employee_store import EmployeeStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EmployeeStore(str(tmp_path / "employees.db")).init_schema().open()
+    yield store
+    store.close()
+
+
+def _run(target):
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+
+
+def test_dead_threads_release_their_connections(store):
+    conns = []
+    for _ in range(20):  # one short-lived worker thread after another
+        _run(lambda: conns.append(store.conn))
+
+    # the main thread plus the last worker, swept on the next checkout
+    assert store.pool.open_connections() == 2
+    _run(lambda: store.conn)
+    for conn in conns:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+
+
+def test_live_threads_keep_their_connection(store):
+    started, done = threading.Barrier(5), threading.Event()
+    reused = []
+
+    def worker():
+        conn = store.conn
+        started.wait()
+        done.wait()
+        reused.append(store.conn is conn)
+        store.data_version()
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    started.wait()
+    _run(lambda: store.conn)  # a new checkout while the workers are alive
+    done.set()
+    for thread in threads:
+        thread.join()
+    assert reused == [True] * 4
@@ -0,0 +1,41 @@
+# department words go through the department index, the rest through FTS5
+import pytest
+
+from WorkSphere.employee_store import EmployeeStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EmployeeStore(str(tmp_path / "employees.db")).init_schema().open()
+    store.add_many([
+        ("Alice Smith", 30, "Engineering", 100),
+        ("Bob Stone", 40, "Sales", 200),
+        ("Sam Alder", 35, "Support", 300),
+        ("Alice Jones", 28, "Sales", 400),
+        ("Eve Alvarez", 50, "Engineering", 500),
+        ("Nobody", 25, None, 600),
+    ])
+    yield store
+    store.close()
+
+
+def _names(rows):
+    return [row["name"] for row in rows]
+
+
+def test_department_words_list_the_department_in_id_order(store):
+    assert _names(store.search("eng")) == ["Alice Smith", "Eve Alvarez"]
+    assert _names(store.search("s")) == ["Bob Stone", "Sam Alder", "Alice Jones"]
+    assert _names(store.search("s", limit=2)) == ["Bob Stone", "Sam Alder"]
+
+
+def test_name_words_are_ranked_within_the_departments(store):
+    assert sorted(_names(store.search("al"))) == ["Alice Jones", "Alice Smith", "Eve Alvarez", "Sam Alder"]
+    assert sorted(_names(store.search("al eng"))) == ["Alice Smith", "Eve Alvarez"]
+    assert _names(store.search("sales alice")) == ["Alice Jones"]
+
+
+def test_searches_without_matches(store):
+    assert store.search("sales eng") == []
+    assert store.search("zzz") == []
+    assert store.search("  ") == []
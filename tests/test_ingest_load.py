@@ -0,0 +1,71 @@
+# other routers stay responsive while an upload is parsed and written
+import io
+import time
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("httpx")
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from WorkSphere import pwd_api
+from WorkSphere.ingest_jobs import JobManager
+from WorkSphere.ingest_pipeline import Pipeline
+
+ROWS = 300_000
+LATENCY_BOUND = 0.25  # seconds, p99 of requests made during the upload
+
+
+def _write_csv(path):
+    frame = pd.DataFrame({
+        "id": range(ROWS),
+        "name": [f"row {i}" for i in range(ROWS)],
+        "value": [i * 0.5 for i in range(ROWS)],
+    })
+    frame.to_csv(path, index=False)
+
+
+# stand-ins for the COPY and MongoDB sinks, doing the same conversions
+def _copy_sink(chunk):
+    chunk.to_csv(io.StringIO(), index=False, header=False)
+
+
+def _mongo_sink(chunk):
+    chunk.to_dict(orient="records")
+
+
+# shaped like file_manager_api.ingest_file, without the databases
+def _ingest(job, path):
+    job.rows_total = ROWS
+    chunks = pd.read_csv(path, chunksize=10000)
+    job.pipeline = Pipeline({"postgres": _copy_sink, "mongo": _mongo_sink}, cancel=job.cancel_event)
+    job.result = job.pipeline.run(chunks)
+    return "uploaded"
+
+
+def test_requests_stay_fast_during_an_upload(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # the password router saves what it generates
+    path = tmp_path / "upload.csv"
+    _write_csv(path)
+    app = FastAPI()
+    app.include_router(pwd_api.router, prefix="/password")
+    jobs = JobManager()
+    latencies = []
+    try:
+        with TestClient(app) as client:
+            job = jobs.submit("upload.csv", _ingest, str(path))
+            while job.active:
+                start = time.perf_counter()
+                response = client.post("/password/generate_password", json={"length": 16})
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200
+    finally:
+        jobs.shutdown()
+
+    assert job.status == "done", job.error
+    assert job.result["rows"] == ROWS
+    assert len(latencies) >= 20, "the upload finished before enough requests were timed"
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    assert p99 < LATENCY_BOUND, f"p99 {p99 * 1000:.0f} ms over {len(latencies)} requests"
@@ -0,0 +1,64 @@
+# every statement in employee_store.QUERY_PLANS must use its index on a
+# freshly migrated employees database
+import random
+
+import pytest
+
+from WorkSphere import employee_stats, employee_store
+from WorkSphere.employee_store import EmployeeStore, query_plan_problems
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EmployeeStore(str(tmp_path / "employees.db")).init_schema().open()
+    yield store
+    store.close()
+
+
+def test_fresh_database_uses_indexes(store):
+    assert store.query_plan_problems() == []
+
+
+def test_skewed_data_after_analyze_uses_indexes(store):
+    rng = random.Random(1)
+    store.add_many(
+        (f"name{i}", 20 + i % 40, "Engineering" if i % 10 else "Sales", rng.randint(1000, 900000))
+        for i in range(20000)
+    )
+    store.add_many([("nobody", 30, None, 5000), ("blank", 30, "", 6000)])
+    store.conn.execute("ANALYZE")
+    assert store.query_plan_problems() == []
+
+
+def test_dropped_index_is_reported(store):
+    store.conn.execute("DROP INDEX idx_employees_department")
+    problems = store.query_plan_problems()
+    assert any(p.startswith("list by department:") for p in problems)
+
+
+class _PlanConnection:
+    # answers EXPLAIN QUERY PLAN with a fixed plan line
+    def __init__(self, detail):
+        self.detail = detail
+
+    def execute(self, query, params=()):
+        return [(0, 0, 0, self.detail)]
+
+
+@pytest.mark.parametrize("detail", ["SCAN employees", "SCAN TABLE employees"])
+def test_table_scans_are_reported_in_both_plan_formats(monkeypatch, detail):
+    monkeypatch.setattr(employee_store, "QUERY_PLANS", [("get", "SELECT 1", (), (), None)])
+    assert query_plan_problems(_PlanConnection(detail)) == [f"get: {detail}"]
+
+
+@pytest.mark.parametrize("detail", ["SCAN hits", "SCAN TABLE hits", "SCAN SUBQUERY 1 AS hits", "SCAN CONSTANT ROW"])
+def test_allowed_scans_pass_in_both_plan_formats(monkeypatch, detail):
+    monkeypatch.setattr(employee_store, "QUERY_PLANS", [("search", "SELECT 1", (), ("hits",), None)])
+    assert query_plan_problems(_PlanConnection(detail)) == []
+
+
+def test_trigger_lookups_follow_the_trigger_definitions():
+    # the min/max lookups checked are the ones the installed triggers run
+    for name, query, params in employee_stats.trigger_queries():
+        subquery = query.removeprefix("SELECT ").replace("= ?", "= old.department")
+        assert subquery in employee_stats.SCHEMA, name
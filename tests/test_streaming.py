@@ -0,0 +1,28 @@
+# shared CSV / NDJSON streaming of batched rows
+import csv
+import io
+import json
+
+from WorkSphere.streaming import stream_csv_or_ndjson
+
+NAMES = ["id", "name", "joined"]
+BATCHES = [[(1, "Ann, Jr.", "2024-01-01")], [], [(2, 'Bo "B"', None)]]
+
+
+def test_csv_has_a_header_and_one_chunk_per_batch():
+    chunks = list(stream_csv_or_ndjson(NAMES, iter(BATCHES), "csv"))
+    assert len(chunks) == 1 + len(BATCHES)
+    rows = list(csv.reader(io.StringIO("".join(chunks))))
+    assert rows == [NAMES, ["1", "Ann, Jr.", "2024-01-01"], ["2", 'Bo "B"', ""]]
+
+
+def test_csv_header_is_sent_for_no_rows():
+    assert list(stream_csv_or_ndjson(NAMES, iter([]), "csv")) == ["id,name,joined\r\n"]
+
+
+def test_ndjson_is_one_object_per_line():
+    text = "".join(stream_csv_or_ndjson(NAMES, iter(BATCHES), "ndjson"))
+    assert [json.loads(line) for line in text.splitlines()] == [
+        {"id": 1, "name": "Ann, Jr.", "joined": "2024-01-01"},
+        {"id": 2, "name": 'Bo "B"', "joined": None},
+    ]
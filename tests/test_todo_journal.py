@@ -0,0 +1,63 @@
+# the journal writer survives I/O errors and loses nothing it acknowledged
+import errno
+import os
+import time
+
+import pytest
+
+from WorkSphere.todo_store import JournalWriteError, TaskStore
+
+
+def _store(tmp_path):
+    store = TaskStore(str(tmp_path / "tasks.json"), str(tmp_path / "tasks.journal"), flush_interval=0.01)
+    store.load()
+    return store
+
+
+def test_failed_fsync_is_reported_and_retried(tmp_path, monkeypatch):
+    store = _store(tmp_path)
+    store.add({"task": "before", "priority": "Low"})
+    assert store.sync(timeout=2)
+
+    real_fsync = os.fsync
+    failures = []
+
+    def failing_fsync(fd):
+        if len(failures) < 2:
+            failures.append(fd)
+            raise OSError(errno.ENOSPC, "No space left on device")
+        real_fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", failing_fsync)
+    store.add({"task": "during", "priority": "High"})
+    with pytest.raises(JournalWriteError):
+        store.sync(timeout=2)
+
+    # the writer retries with backoff and catches up once the disk recovers
+    store.add({"task": "after", "priority": "Medium"})
+    deadline = time.monotonic() + 5
+    while True:
+        try:
+            assert store.sync(timeout=1)
+            break
+        except JournalWriteError:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+    assert store._writer.is_alive()
+    assert store.write_error is None
+    monkeypatch.setattr(os, "fsync", real_fsync)
+
+    replayed = TaskStore(str(tmp_path / "tasks.json"), str(tmp_path / "tasks.journal"))
+    replayed.replay()
+    assert [t.task for t in replayed.tasks.values()] == ["before", "during", "after"]
+    store.close()
+
+
+def test_sync_times_out_without_raising(tmp_path, monkeypatch):
+    store = _store(tmp_path)
+    monkeypatch.setattr(store, "_flush", lambda: True)  # the writer never makes progress
+    store.add({"task": "slow"})
+    assert store.sync(timeout=0.1) is False
+    monkeypatch.undo()
+    assert store.sync(timeout=2)
+    store.close()
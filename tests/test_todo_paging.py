@@ -0,0 +1,49 @@
+# filtered pages come from the matching secondary index, in id order
+import random
+
+import pytest
+
+from WorkSphere.todo_sqlite import SqliteTaskStore
+from WorkSphere.todo_store import TaskStore
+
+PRIORITIES = ("High", "Medium", "Low")
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "json":
+        store = TaskStore(str(tmp_path / "tasks.json"), str(tmp_path / "tasks.journal"))
+    else:
+        store = SqliteTaskStore(str(tmp_path / "tasks.db"), str(tmp_path / "tasks.json"),
+                                str(tmp_path / "tasks.journal"))
+    store.load()
+    yield store
+    store.close()
+
+
+def _all_pages(store, limit, **filters):
+    ids, cursor = [], None
+    while True:
+        page, cursor = store.page(limit, cursor=cursor, **filters)
+        ids.extend(task["id"] for task in page)
+        if cursor is None:
+            return ids
+
+
+def test_pages_match_a_full_filter(store):
+    rng = random.Random(3)
+    for i in range(300):
+        store.add({"task": f"task {i}", "priority": rng.choice(PRIORITIES), "completed": rng.random() < 0.5})
+    for task_id in rng.sample(range(1, 301), 60):
+        if rng.random() < 0.5:
+            store.delete(task_id)
+        else:
+            store.update(task_id, priority=rng.choice(PRIORITIES), completed=rng.random() < 0.5)
+
+    tasks = store.all()
+    for priority in (None,) + PRIORITIES:
+        for completed in (None, True, False):
+            expected = [t["id"] for t in tasks
+                        if (priority is None or t["priority"] == priority)
+                        and (completed is None or t["completed"] == completed)]
+            assert _all_pages(store, 7, priority=priority, completed=completed) == expected